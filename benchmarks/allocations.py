@@ -0,0 +1,89 @@
+"""
+Objects the interpreter creates per evaluation, every class of the parser
+module is counted while evaluating typical property values. Run it with
+`python benchmarks/allocations.py`.
+"""
+
+import inspect
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from tksystem import parser
+
+VALUES = [
+    "self.master['bg']",
+    "(lambda (x) -> x * 2)(4)",
+    "rgb(32, 32, 32)",
+    "{'row': 0, 'column': 1}",
+    "1 < 2 and not 0",
+]
+
+
+class Widget:
+    def __init__(self, master=None):
+        self.master = master
+        self.options = {'bg': '#181818'}
+
+    def __getitem__(self, key):
+        return self.options[key]
+
+
+def count_instances(counts):
+    """Wraps the __init__ of every class of the parser module so each new
+    instance increments its counter.
+    """
+    def wrap(cls, init):
+        def __init__(self, *args, **kwargs):
+            if type(self) is cls:
+                counts[cls.__name__] = counts.get(cls.__name__, 0) + 1
+            init(self, *args, **kwargs)
+        return __init__
+
+    originals = {}
+    for name, cls in inspect.getmembers(parser, inspect.isclass):
+        if cls.__module__ != parser.__name__: continue
+        originals[cls] = cls.__dict__.get('__init__')
+        cls.__init__ = wrap(cls, cls.__init__)
+    return originals
+
+
+def restore(originals):
+    for cls, init in originals.items():
+        if init is None: del cls.__init__
+        else: cls.__init__ = init
+
+
+def measure(repeat=1000):
+    scope = {'self': Widget(Widget())}
+    results = {}
+    for text in VALUES:
+        node, error = parser.parse('<TkSystem>', text)
+        parser.evaluate(node, scope)
+
+        counts = {}
+        originals = count_instances(counts)
+        try:
+            for _ in range(repeat): parser.evaluate(node, scope)
+        finally:
+            restore(originals)
+
+        tracemalloc.start()
+        for _ in range(repeat): parser.evaluate(node, scope)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        results[text] = {
+            'objects': sum(counts.values()) / repeat,
+            'peak_bytes': peak,
+            'classes': {name: count / repeat for name, count in sorted(counts.items())}
+        }
+    return results
+
+
+if __name__ == '__main__':
+    for text, result in measure().items():
+        classes = ', '.join([f'{name}={count:g}' for name, count in result['classes'].items()])
+        print(f"{text:26} {result['objects']:5.1f} objects/eval {result['peak_bytes']:7,} peak bytes  {classes}")
@@ -0,0 +1,92 @@
+"""
+Generator of synthetic .tk files for the benchmarks. Widgets are nested up to
+`depth` frames and their property values are taken from levels of increasing
+complexity, from plain literals (0) to lambdas and references to `self` (2).
+Files are valid for `load`, run it with
+`python benchmarks/generate.py widgets [filename] [depth] [complexity]`.
+"""
+
+import random
+import sys
+
+SIZES = (10, 1000, 10000, 100000)
+
+# values of every property by level of complexity, `{n}` is the widget number.
+VALUES = {
+    'text': (
+        "'widget {n}'",
+        "'widget ' + '{n}'",
+        "(lambda (name) -> 'widget ' + name)('{n}')"
+    ),
+    'bg': (
+        "'#181818'",
+        "rgb(24, 24, 24)",
+        "self.master['bg']"
+    ),
+    'fg': (
+        "'#FFFFFF'",
+        "rgb(255, 255, 255)",
+        "rgb(200 + 55, 255, 5 * 51)"
+    ),
+    'padx': (
+        "5",
+        "2 + 3",
+        "(lambda (x) -> x * 2 + 1)(2)"
+    ),
+    'pady': (
+        "2",
+        "4 / 2",
+        "1 < 2 and 3 or 4"
+    ),
+    '.pack': (
+        "{}",
+        "{'fill': 'x'}",
+        "{'fill': 'x', 'padx': 1 + 1, 'pady': [1, 2]}"
+    )
+}
+
+WIDGETS = {
+    'Frame': ('bg', 'padx', 'pady', '.pack'),
+    'Label': ('text', 'bg', 'fg', 'padx', 'pady', '.pack'),
+    'Button': ('text', 'bg', 'fg', 'padx', '.pack')
+}
+
+
+def make_lines(widgets, depth=3, complexity=2, seed=0):
+    """Yields the lines of a file with a `Tk` root and the given number of
+    widgets under it, the same arguments always give the same file.
+    """
+    rng = random.Random(seed)
+    yield 'Tk\n'
+    yield "\t.title: 'benchmark'\n"
+    yield f"\tbg: {VALUES['bg'][0]}\n"
+    level = 0
+    for n in range(widgets):
+        if level and rng.random() < 0.3: level = rng.randint(0, level - 1)
+        if level < depth - 1 and rng.random() < 0.3: name = 'Frame'
+        else: name = rng.choice(('Label', 'Button'))
+        tabs = '\t' * (level + 1)
+        yield f'{tabs}{name}\n'
+        for key in WIDGETS[name]:
+            value = rng.choice(VALUES[key][:complexity + 1]).replace('{n}', str(n))
+            yield f'{tabs}\t{key}: {value}\n'
+        if name == 'Frame': level += 1
+
+
+def make_file(widgets, depth=3, complexity=2, seed=0):
+    return ''.join(make_lines(widgets, depth, complexity, seed))
+
+
+def write_file(filename, widgets, depth=3, complexity=2, seed=0):
+    with open(filename, 'w') as f:
+        f.writelines(make_lines(widgets, depth, complexity, seed))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2: sys.exit(__doc__)
+    widgets = int(sys.argv[1])
+    filename = sys.argv[2] if len(sys.argv) > 2 else f'bench_{widgets}.tk'
+    depth = int(sys.argv[3]) if len(sys.argv) > 3 else 3
+    complexity = int(sys.argv[4]) if len(sys.argv) > 4 else 2
+    write_file(filename, widgets, depth, complexity)
+    print(f'{filename}: {widgets} widgets')
@@ -0,0 +1,74 @@
+"""
+Memory used by the objects the parser creates, reports the bytes per token,
+per AST node and per runtime value for a set of typical property values.
+Run it with `python benchmarks/memory.py`.
+"""
+
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from tksystem import parser
+
+VALUES = [
+    "'#181818'",
+    "rgb(32, 32, 32)",
+    "{'row': 0, 'column': 1, 'padx': 5, 'pady': 5}",
+    "[1, 2.5, 'text', [3, 4]]",
+    "(lambda (x) -> x * 2 + 1)(4)",
+    "'Simple ' + 'UI'",
+    "1 < 2 and not 0",
+]
+
+
+def count_nodes(node):
+    children = []
+    for name in ('left_node', 'right_node', 'node', 'body'):
+        if child := getattr(node, name, None): children.append(child)
+    for name in ('args', 'elements', 'keys', 'values'):
+        children.extend([
+            child for child in getattr(node, name, None) or []
+            if not isinstance(child, parser.Token)
+        ])
+    return 1 + sum([count_nodes(child) for child in children])
+
+
+def traced(build):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return size, result
+
+
+def measure(copies=2000):
+    texts = [f'{value} ' for _ in range(copies) for value in VALUES]
+
+    size, tokens = traced(lambda: [parser.Lexer('<TkSystem>', text).make_tokens()[0] for text in texts])
+    token_count = sum([len(token_list) for token_list in tokens])
+    results = {'bytes/token': size / token_count}
+
+    size, nodes = traced(lambda: [parser.Parser(token_list).parse().node for token_list in tokens])
+    node_count = sum([count_nodes(node) for node in nodes])
+    results['bytes/node'] = size / node_count
+
+    def interpret():
+        values = []
+        for node in nodes:
+            context = parser.Context('<program>', symbol_table=parser.global_symbol_table)
+            values.append(parser.interpreter.visit(node, context)[0])
+        return values
+
+    size, values = traced(interpret)
+    results['bytes/value'] = size / len(values)
+    results['tokens'] = token_count
+    results['nodes'] = node_count
+    return results
+
+
+if __name__ == '__main__':
+    for name, value in measure().items():
+        print(f'{name:>12}: {value:,.1f}' if isinstance(value, float) else f'{name:>12}: {value:,}')
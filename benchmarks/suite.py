@@ -0,0 +1,271 @@
+"""
+Benchmark suite of tksystem, times the lexer, the parser, the interpreter,
+`functions.parse_file`, the compilation of a file, full `load` runs and
+`functions.apply` on the synthetic files of `generate.py`. Results can be
+saved as a JSON baseline and compared later, a benchmark slower than the
+baseline by more than the threshold is a regression and the suite exits
+with 1. `load_headless` runs the loader with `RecordingBackend`, the loads
+with tk need a display and are skipped without one.
+
+    python benchmarks/suite.py                      run and print the results
+    python benchmarks/suite.py --save base.json     also save them
+    python benchmarks/suite.py --compare base.json  run and compare
+    python benchmarks/suite.py --compare base.json new.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import tksystem
+from tksystem import functions, parser
+from tksystem.backends import RecordingBackend
+from tksystem.program import compile_lines, iter_widgets
+
+from generate import SIZES, write_file
+
+# (widgets, depth, complexity) of every file, the sizes use the defaults and
+# the rest vary the nesting and the values at a fixed size.
+DEPTH = 3
+COMPLEXITY = 2
+VARIANTS = ((1000, 1, 2), (1000, 8, 2), (1000, 3, 0), (1000, 3, 1))
+# full loads of bigger files take too long to be repeated.
+LOAD_LIMIT = 10000
+THRESHOLD = 0.10
+
+
+class Widget:
+    def __init__(self, master=None):
+        self.master = master
+        self.options = {'bg': '#181818'}
+
+    def __getitem__(self, key):
+        return self.options[key]
+
+
+def case_name(widgets, depth, complexity):
+    if (depth, complexity) == (DEPTH, COMPLEXITY): return str(widgets)
+    return f'{widgets},depth={depth},complexity={complexity}'
+
+
+def measure(function, min_time=0.5, min_rounds=3, max_rounds=50):
+    """Runs the function once to warm up and then until it was run for
+    `min_time` seconds, returns the times of every round.
+    """
+    function()
+    times = []
+    while len(times) < min_rounds or (sum(times) < min_time and len(times) < max_rounds):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def text_benchmarks(text):
+    """Benchmarks that only need the text of the file, every step gets the
+    output of the previous one already computed.
+    """
+    lines = text.splitlines()
+    sources = [prop.source for record in iter_widgets(lines) for prop in record.properties]
+    tokens = [parser.Lexer('<TkSystem>', source).make_tokens()[0] for source in sources]
+    nodes = [parser.Parser(tokens_).parse().node for tokens_ in tokens]
+    symbol_table = parser.SymbolTable(parser.global_symbol_table, namespace={'self': Widget(Widget())})
+    context = parser.Context('<program>', symbol_table=symbol_table)
+
+    def lexer():
+        for source in sources: parser.Lexer('<TkSystem>', source).make_tokens()
+
+    def parse():
+        for tokens_ in tokens: parser.Parser(tokens_).parse()
+
+    def interpreter():
+        for node in nodes: parser.interpreter.visit(node, context)
+
+    def parse_file():
+        functions.parse_file(text)
+
+    def compile_file():
+        parser.ast_cache.clear()
+        compile_lines('<bench>', lines)
+
+    return {
+        'lexer': lexer,
+        'parser': parse,
+        'interpreter': interpreter,
+        'parse_file': parse_file,
+        'compile': compile_file
+    }
+
+
+def headless_benchmark(filename, text):
+    """Full load without cache that records the widgets instead of creating
+    them, what is left is the cost of the loader alone. `apply_headless`
+    gives the loaded window the text with another background every round,
+    the cost of updating it instead of loading it again.
+    """
+    def load_headless():
+        os.environ['TKSYSTEM_NO_CACHE'] = '1'
+        window, error = functions.load(filename, None, backend=RecordingBackend())
+        if error: sys.exit(error)
+
+    window, error = functions.load(filename, None, backend=RecordingBackend())
+    if error: sys.exit(error)
+    texts = [text, text.replace("'#181818'", "'#202020'")]
+
+    def apply_headless():
+        texts.reverse()
+        changes, error = functions.apply(window, texts[0])
+        if error: sys.exit(error)
+    return {'load_headless': load_headless, 'apply_headless': apply_headless}
+
+
+def display_available():
+    try:
+        import tkinter
+        tkinter.Tk().destroy()
+    except Exception:
+        return False
+    return True
+
+
+def load_benchmarks(filename, cache_dir):
+    """Full loads without cache (cold) and from the cache (warm), the window
+    is destroyed out of the timed part.
+    """
+    windows = []
+
+    def run(cached):
+        os.environ.pop('TKSYSTEM_NO_CACHE', None)
+        if not cached: os.environ['TKSYSTEM_NO_CACHE'] = '1'
+        os.environ['TKSYSTEM_CACHE_DIR'] = cache_dir
+        window, error = functions.load(filename, None)
+        if error: sys.exit(error)
+        windows.append(window)
+
+    def timed(cached):
+        def function():
+            run(cached)
+            if len(windows) > 1: windows.pop(0).destroy()
+        return function
+
+    return {'load_cold': timed(False), 'load_warm': timed(True)}, windows
+
+
+def run_suite(sizes, min_time):
+    cases = [(widgets, DEPTH, COMPLEXITY) for widgets in sizes]
+    cases.extend([variant for variant in VARIANTS if variant[0] in sizes])
+    display = display_available()
+    if not display: print('no display, only load_headless is run')
+    environ = dict(os.environ)
+    results = {}
+    with tempfile.TemporaryDirectory() as folder:
+        for widgets, depth, complexity in cases:
+            filename = os.path.join(folder, f'bench_{widgets}_{depth}_{complexity}.tk')
+            write_file(filename, widgets, depth, complexity)
+            with open(filename) as f:
+                text = f.read()
+            benchmarks = text_benchmarks(text)
+            benchmarks.update(headless_benchmark(filename, text))
+            windows = []
+            if display and widgets <= LOAD_LIMIT:
+                loads, windows = load_benchmarks(filename, os.path.join(folder, 'cache'))
+                benchmarks.update(loads)
+            try:
+                for name, function in benchmarks.items():
+                    key = f'{name}[{case_name(widgets, depth, complexity)}]'
+                    times = measure(function, min_time)
+                    results[key] = {
+                        'widgets': widgets,
+                        'min': min(times),
+                        'median': statistics.median(times),
+                        'rounds': len(times)
+                    }
+                    print_result(key, results[key])
+            finally:
+                for window in windows: window.destroy()
+                os.environ.clear()
+                os.environ.update(environ)
+    return results
+
+
+def print_result(key, result):
+    per_widget = result['min'] / result['widgets'] * 1e6
+    print(
+        f"{key:42} {result['min'] * 1000:10.3f} ms  {result['median'] * 1000:10.3f} ms median"
+        f"  {per_widget:8.2f} us/widget  ({result['rounds']} rounds)"
+    )
+
+
+def metadata():
+    return {
+        'tksystem': tksystem.__version__,
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'date': time.strftime('%Y-%m-%dT%H:%M:%S')
+    }
+
+
+def save(filename, results):
+    with open(filename, 'w') as f:
+        json.dump({'meta': metadata(), 'results': results}, f, indent=4)
+
+
+def read(filename):
+    with open(filename) as f:
+        return json.load(f)['results']
+
+
+def compare(baseline, results, threshold=THRESHOLD):
+    """Prints the change of every benchmark in both results and returns the
+    ones slower than the baseline by more than the threshold.
+    """
+    regressions = []
+    for key, result in results.items():
+        if key not in baseline: continue
+        ratio = result['min'] / baseline[key]['min']
+        if ratio > 1 + threshold:
+            regressions.append(key)
+            flag = 'REGRESSION'
+        elif ratio < 1 - threshold: flag = 'faster'
+        else: flag = ''
+        print(
+            f"{key:42} {baseline[key]['min'] * 1000:10.3f} ms -> {result['min'] * 1000:10.3f} ms"
+            f"  {ratio - 1:+7.1%}  {flag}"
+        )
+    missing = [key for key in baseline if key not in results]
+    if missing: print(f'not run: {", ".join(missing)}')
+    return regressions
+
+
+def main():
+    arguments = argparse.ArgumentParser(description='Benchmark suite of tksystem.')
+    arguments.add_argument('--sizes', type=int, nargs='+', default=SIZES, help='widgets of the files')
+    arguments.add_argument('--min-time', type=float, default=0.5, help='seconds every benchmark runs at least')
+    arguments.add_argument('--save', metavar='FILE', help='saves the results as a JSON baseline')
+    arguments.add_argument('--compare', metavar='FILE', nargs='+', help='baseline and optionally the results to compare with it')
+    arguments.add_argument('--threshold', type=float, default=THRESHOLD, help='slowdown that counts as regression')
+    args = arguments.parse_args()
+
+    if args.compare and len(args.compare) > 1:
+        results = read(args.compare[1])
+    else:
+        results = run_suite(args.sizes, args.min_time)
+    if args.save: save(args.save, results)
+    if not args.compare: return 0
+
+    print()
+    regressions = compare(read(args.compare[0]), results, args.threshold)
+    if regressions: print(f'{len(regressions)} regressions beyond {args.threshold:.0%}')
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,60 @@
+"""
+Tcl calls made by `load` to build a window of many widgets with a few
+options each, with every backend. Needs a display, run it with
+`python benchmarks/tcl_calls.py [widgets]`.
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from tksystem import functions
+from tksystem.backends import TclScriptBackend, TkBackend
+from tksystem.stats import LoadStats
+
+WIDGET = '''\tLabel
+\t\ttext: 'label {0}'
+\t\tbg: rgb(32, 32, 32)
+\t\tfg: '#FFFFFF'
+\t\tpadx: 5
+\t\tpady: 2
+\t\tanchor: 'w'
+\t\t.pack: {{'fill': 'x'}}
+'''
+
+
+def make_file(widgets):
+    lines = ['Tk\n', "\t.title: 'Tcl calls'\n"]
+    lines.extend([WIDGET.format(i) for i in range(widgets)])
+    return ''.join(lines)
+
+
+def measure(filename, widgets, backend):
+    stats = LoadStats()
+    start = time.perf_counter()
+    window, error = functions.load(filename, None, stats=stats, backend=backend)
+    elapsed = time.perf_counter() - start
+    if error: sys.exit(error)
+    print(type(backend).__name__)
+    print(f'  tcl calls:    {stats.tcl_calls}')
+    print(f'  per widget:   {stats.tcl_calls / widgets:.2f}')
+    print(f'  time:         {elapsed * 1000:.1f} ms')
+    window.destroy()
+
+
+def main():
+    widgets = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+    print(f'widgets:        {widgets}')
+    with tempfile.TemporaryDirectory() as folder:
+        filename = os.path.join(folder, 'bench.tk')
+        with open(filename, 'w') as f:
+            f.write(make_file(widgets))
+        for backend in (TkBackend(), TclScriptBackend()):
+            measure(filename, widgets, backend)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,2 +1,19 @@
-from tksystem import functions
-from tksystem import reloader
\ No newline at end of file
+__version__ = '0.0.5'
+
+# submodules are imported the first time they are used, importing tksystem
+# doesn't import tkinter nor pylejandria.
+SUBMODULES = (
+    'backends', 'cache', 'compiler', 'functions', 'parser',
+    'program', 'reconcile', 'registry', 'reloader', 'stats', 'watcher'
+)
+
+
+def __getattr__(name):
+    if name in SUBMODULES:
+        from importlib import import_module
+        return import_module(f'tksystem.{name}')
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+def __dir__():
+    return sorted(list(globals()) + list(SUBMODULES))
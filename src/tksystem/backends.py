@@ -0,0 +1,479 @@
+"""
+Backends build the widgets of a compiled `Program`. `TkBackend` is the
+default, it creates every widget from python. `TclScriptBackend` writes the
+widgets of tkinter it knows, their options and their geometry as a single tcl
+script that is evaluated at once, python objects are attached to the created
+paths so ids, callbacks and methods keep working. `RecordingBackend` creates
+no widget at all, it records what would be done so the loader can be run and
+measured without a display.
+"""
+
+import sys
+from time import perf_counter
+
+from tksystem.compiler import BUILTINS
+
+#######################################
+# HELPERS
+#######################################
+
+GEOMETRY_MANAGERS = ('pack', 'grid', 'place')
+
+
+def is_ready(expression, scope):
+    """Tells if the value can be evaluated before its widget is created."""
+    if expression is None: return True
+    names = expression.names
+    if 'self' in names: return False
+    return all([name in scope or name in BUILTINS for name in names])
+
+
+def uses_widgets(expression, scope):
+    """Tells if the value can reach a widget, directly or by its id."""
+    if expression is None: return False
+    widgets = scope.maps[1]
+    return any([name == 'self' or name in widgets for name in expression.names])
+
+
+def uses_ids(record, scope):
+    """Tells if a property of the record uses a widget by its id."""
+    ids = scope.maps[1]
+    return any([
+        prop.expression is not None and any([name in ids for name in prop.expression.names])
+        for prop in record.properties
+    ])
+
+
+def evaluate(prop, scope, interpret, stats=None):
+    if prop.expression is None: return None, None
+    if stats: start = perf_counter()
+    if interpret: value, error = prop.expression.interpret(scope)
+    else: value, error = prop.expression.evaluate(scope)
+    if stats:
+        stats.add('evaluate', start, line=prop.line)
+        if not error: stats.track(value, prop.line)
+    if error: return None, error.as_string(prop.line)
+    return value, None
+
+
+TK_MODULES = ('tkinter', 'tkinter.ttk')
+
+
+def takes_options(widget_class):
+    """Tells if the options can be given all at once to the constructor or
+    to `configure`, only when its constructor, `__setitem__` and `configure`
+    are the ones of tkinter. Other classes (like the widgets of pylejandria)
+    may handle options of their own in `__setitem__`.
+    """
+    return all([
+        getattr(getattr(widget_class, name, None), '__module__', None) in TK_MODULES
+        for name in ('__init__', '__setitem__', 'configure')
+    ])
+
+
+def configure(widget, options, widget_class=None):
+    if not options: return
+    if widget_class is None: widget_class = type(widget)
+    if takes_options(widget_class): widget.configure(**options)
+    else:
+        for key, value in options.items():
+            widget[key] = value
+
+
+def phase_of(key):
+    """Phase of the stats a deferred property is measured in."""
+    if key == 'id': return 'ids'
+    if key == 'execute': return 'methods'
+    if key.startswith('.'):
+        return 'geometry' if key[1:] in GEOMETRY_MANAGERS else 'methods'
+    return 'configure'
+
+
+# widgets whose children are pages shown one at a time, by module and class
+# name, the children of their pages are built the first time they are shown.
+LAZY_PARENTS = {
+    'tkinter.ttk': ('Notebook',),
+    'pylejandria.gui': ('Container',)
+}
+
+
+def has_pages(widget_class):
+    return any([
+        cls.__name__ in LAZY_PARENTS.get(cls.__module__, ())
+        for cls in getattr(widget_class, '__mro__', ())
+    ])
+
+
+def is_lazy(record, parent_class, scope, interpret):
+    """Tells if the children of the record are left to be built when its
+    widget is shown, by its `lazy` property or else for the pages of a
+    notebook or a container. Returns it and an error.
+    """
+    for prop in record.properties:
+        if prop.key != 'lazy': continue
+        value, error = evaluate(prop, scope, interpret)
+        return bool(value), error
+    return parent_class is not None and has_pages(parent_class), None
+
+
+def split_properties(record, scope, interpret, stats=None):
+    """Evaluates the plain options that don't need the widget, returns them
+    with the properties left to run after it is created and an error.
+    """
+    options = {}
+    deferred = []
+    for prop in record.properties:
+        key = prop.key
+        if key in ('lazy', 'page_cache'): continue
+        if (
+            key in ('id', 'execute') or key.startswith('.')
+            or not is_ready(prop.expression, scope)
+        ):
+            deferred.append(prop)
+            continue
+        value, error = evaluate(prop, scope, interpret, stats)
+        if error: return None, None, error
+        options[key] = value
+    return options, deferred, None
+
+#######################################
+# TK BACKEND
+#######################################
+
+class TkBackend:
+    """Creates the widgets one by one from python."""
+    def build(self, program, scope, widget_classes, interpret, stats=None, widgets=None):
+        """Creates the widgets of the program, `scope` is the chain of the
+        current widget, the ids and the module names. The widgets created are
+        added to the `widgets` list if given, one per record, and then the
+        children of lazy widgets are not built, they get None.
+        """
+        parents = []
+        main = None
+        skip = None
+
+        for record in program.records:
+            if skip is not None and record.indent > skip:
+                widgets.append(None)
+                continue
+            skip = None
+            while parents and parents[-1][0] >= record.indent:
+                parents.pop()
+            parent, parent_class = parents[-1][1:] if parents else (None, None)
+            widget_class = widget_classes[record.name]
+            if stats: stats.enter(record, len(parents))
+
+            widget, error = self.build_record(
+                record, parent, widget_class, scope, interpret, main is None, stats
+            )
+            if error: return None, error
+            if widgets is not None:
+                widgets.append(widget)
+                lazy, error = is_lazy(record, parent_class, scope, interpret)
+                if error: return None, error
+                if lazy: skip = record.indent
+
+            if main is None:
+                main = widget
+            parents.append((record.indent, widget, widget_class))
+
+        return main, None
+
+    def build_record(self, record, parent, widget_class, scope, interpret, is_root=False, stats=None):
+        """Creates the widget of a single record under the parent and runs its
+        properties, returns the widget and an error.
+        """
+        options, deferred, error = split_properties(record, scope, interpret, stats)
+        if error: return None, error
+        if stats: start = perf_counter()
+        widget = self.create(widget_class, parent, options, is_root, stats)
+        if stats:
+            stats.add('create', start, line=record.line)
+            stats.track(widget, record.line)
+        scope.maps[0]['self'] = widget
+
+        for prop in deferred:
+            value, error = evaluate(prop, scope, interpret, stats)
+            if error:
+                if not is_root: widget.destroy()
+                return None, error
+            if stats: start = perf_counter()
+            self.apply(widget, prop.key, value, scope)
+            if stats: stats.add(phase_of(prop.key), start, line=prop.line)
+        return widget, None
+
+    def create(self, widget_class, parent, options, is_root, stats=None):
+        if is_root:
+            widget = widget_class()
+            if stats: stats.count_tcl_calls(widget)
+            configure(widget, options, widget_class)
+        elif takes_options(widget_class): widget = widget_class(parent, **options)
+        else:
+            widget = widget_class(parent)
+            configure(widget, options, widget_class)
+        return widget
+
+    def apply(self, widget, key, value, scope):
+        if key == 'id': scope.maps[1][value] = widget
+        elif key == 'execute':
+            function, args, kwargs = value
+            function(*args, **kwargs)
+        elif key.startswith('.'):
+            method = getattr(widget, key[1:])
+            if isinstance(value, list): method(*value)
+            elif isinstance(value, dict): method(**value)
+            else: method(value)
+        else: widget[key] = value
+
+    def when_shown(self, widget, function):
+        """Calls `function` every time the widget is shown."""
+        widget.bind('<Map>', lambda event: function(), '+')
+
+#######################################
+# TCL SCRIPT BACKEND
+#######################################
+
+# tcl commands of the widgets that can be written in the script by module and
+# class name, kept as names so tkinter is not imported to build it.
+SCRIPT_WIDGETS = {
+    'tkinter': {
+        'Button': 'button',
+        'Canvas': 'canvas',
+        'Checkbutton': 'checkbutton',
+        'Entry': 'entry',
+        'Frame': 'frame',
+        'Label': 'label',
+        'LabelFrame': 'labelframe',
+        'Listbox': 'listbox',
+        'Menubutton': 'menubutton',
+        'Message': 'message',
+        'PanedWindow': 'panedwindow',
+        'Radiobutton': 'radiobutton',
+        'Scale': 'scale',
+        'Scrollbar': 'scrollbar',
+        'Spinbox': 'spinbox',
+        'Text': 'text'
+    },
+    'tkinter.ttk': {
+        'Button': 'ttk::button',
+        'Checkbutton': 'ttk::checkbutton',
+        'Combobox': 'ttk::combobox',
+        'Entry': 'ttk::entry',
+        'Frame': 'ttk::frame',
+        'Label': 'ttk::label',
+        'Labelframe': 'ttk::labelframe',
+        'Menubutton': 'ttk::menubutton',
+        'Notebook': 'ttk::notebook',
+        'Panedwindow': 'ttk::panedwindow',
+        'Progressbar': 'ttk::progressbar',
+        'Radiobutton': 'ttk::radiobutton',
+        'Scrollbar': 'ttk::scrollbar',
+        'Separator': 'ttk::separator',
+        'Sizegrip': 'ttk::sizegrip',
+        'Spinbox': 'ttk::spinbox',
+        'Treeview': 'ttk::treeview'
+    }
+}
+
+
+def script_command(widget_class):
+    """Tcl command that creates the widget, None if it can't be scripted.
+    Subclasses are never scripted, they may do more in `__init__`.
+    """
+    module = widget_class.__module__
+    command = SCRIPT_WIDGETS.get(module, {}).get(widget_class.__name__)
+    if command is None: return None
+    if vars(sys.modules[module]).get(widget_class.__name__) is not widget_class: return None
+    return command
+
+
+def wrap(widget_class, parent, command):
+    """Python object of a widget that will be created by the script, it is
+    set up as tkinter does without calling tcl.
+    """
+    widget = widget_class.__new__(widget_class)
+    widget.widgetName = command
+    widget._setup(parent, {})
+    widget._tclCommands = []
+    return widget
+
+
+def tcl_command(words):
+    from tkinter import _stringify
+    return ' '.join([_stringify(word) for word in words])
+
+
+class TclScriptBackend(TkBackend):
+    """Writes the known tkinter widgets as tcl commands and runs them with one
+    eval. The script is run earlier when something needs the widgets to
+    exist: widgets it can't write, `execute`, methods other than geometry
+    managers and values that use a widget.
+    """
+    def build(self, program, scope, widget_classes, interpret, stats=None, widgets=None):
+        frame = scope.maps[0]
+        parents = []
+        main = None
+        self.script = []
+        self.stats = stats
+        skip = None
+
+        for record in program.records:
+            if skip is not None and record.indent > skip:
+                widgets.append(None)
+                continue
+            skip = None
+            while parents and parents[-1][0] >= record.indent:
+                parents.pop()
+            parent, parent_class = parents[-1][1:] if parents else (None, None)
+            widget_class = widget_classes[record.name]
+            command = script_command(widget_class) if main is not None else None
+            if stats: stats.enter(record, len(parents))
+
+            # options evaluated before the widget exists may read widgets of
+            # the script by id, they must exist first.
+            if self.script and uses_ids(record, scope): self.flush(main)
+            options, deferred, error = split_properties(record, scope, interpret, stats)
+            if error: return None, error
+            if command is None:
+                self.flush(main)
+                if stats: start = perf_counter()
+                widget = self.create(widget_class, parent, options, main is None, stats)
+                if stats: stats.add('create', start, line=record.line)
+            else:
+                if stats: start = perf_counter()
+                widget = wrap(widget_class, parent, command)
+                self.script.append(tcl_command((command, widget._w) + widget._options(options)))
+                if stats: stats.add('script', start, line=record.line)
+            if stats: stats.track(widget, record.line)
+            if widgets is not None: widgets.append(widget)
+            frame['self'] = widget
+
+            for prop in deferred:
+                key = prop.key
+                if key == 'execute' or uses_widgets(prop.expression, scope):
+                    self.flush(main)
+                value, error = evaluate(prop, scope, interpret, stats)
+                if error: return None, error
+                if self.script:
+                    if stats: start = perf_counter()
+                    written = self.write(widget, key, value, prop.expression, scope)
+                    if stats: stats.add('script', start, line=prop.line)
+                    if written: continue
+                self.flush(main)
+                if stats: start = perf_counter()
+                self.apply(widget, key, value, scope)
+                if stats: stats.add(phase_of(key), start, line=prop.line)
+            if widgets is not None:
+                lazy, error = is_lazy(record, parent_class, scope, interpret)
+                if error: return None, error
+                if lazy: skip = record.indent
+
+            if main is None:
+                main = widget
+            parents.append((record.indent, widget, widget_class))
+
+        self.flush(main)
+        return main, None
+
+    def write(self, widget, key, value, expression, scope):
+        """Adds the property to the script if possible."""
+        if key == 'id':
+            scope.maps[1][value] = widget
+            return True
+        if key.startswith('.'):
+            manager = key[1:]
+            if manager not in GEOMETRY_MANAGERS or not isinstance(value, dict): return False
+            words = (manager, 'configure', widget._w) + widget._options(value)
+        elif key == 'execute' or uses_widgets(expression, scope): return False
+        else: words = (widget._w, 'configure') + widget._options({key: value})
+        self.script.append(tcl_command(words))
+        return True
+
+    def flush(self, main):
+        if not self.script: return
+        if self.stats: start = perf_counter()
+        script = '\n'.join(self.script)
+        self.script = []
+        main.tk.eval(script)
+        if self.stats: self.stats.add('eval_script', start)
+
+#######################################
+# RECORDING BACKEND
+#######################################
+
+class RecordedWidget:
+    """Stands in the place of a widget, keeps its options and records every
+    option set and method call in the backend without calling tcl.
+    """
+    def __init__(self, backend, widget_class, master, options):
+        self._backend = backend
+        self.widget_class = widget_class
+        self.master = master
+        self.options = dict(options)
+        self.children = []
+        if master is not None: master.children.append(self)
+
+    def __getitem__(self, key):
+        return self.options.get(key, '')
+
+    def __setitem__(self, key, value):
+        self.options[key] = value
+        self._backend.events.append(('set', self, key, value))
+
+    def configure(self, **options):
+        self.options.update(options)
+        self._backend.events.append(('configure', self, options))
+
+    config = configure
+
+    def cget(self, key):
+        return self[key]
+
+    def destroy(self):
+        if self.master is not None and self in self.master.children:
+            self.master.children.remove(self)
+        self._backend.events.append(('call', self, 'destroy', (), {}))
+
+    def __getattr__(self, name):
+        if name.startswith('_'): raise AttributeError(name)
+        events = self._backend.events
+
+        def method(*args, **kwargs):
+            if name in GEOMETRY_MANAGERS: events.append(('geometry', self, name, args, kwargs))
+            else: events.append(('call', self, name, args, kwargs))
+        return method
+
+    def __repr__(self):
+        return f'<RecordedWidget {self.widget_class.__name__}>'
+
+
+class RecordingBackend(TkBackend):
+    """Builds `RecordedWidget`s instead of widgets, so a program can be loaded
+    without a display and the cost of tk is left out. `events` has a tuple
+    for every step, in order:
+
+        ('create', widget, options)
+        ('set', widget, key, value)
+        ('configure', widget, options)
+        ('geometry', widget, manager, args, kwargs)
+        ('call', widget, name, args, kwargs)
+    """
+    def __init__(self):
+        self.events = []
+
+    def build(self, program, scope, widget_classes, interpret, stats=None, widgets=None):
+        self.events = []
+        return super().build(program, scope, widget_classes, interpret, stats, widgets)
+
+    def create(self, widget_class, parent, options, is_root, stats=None):
+        widget = RecordedWidget(self, widget_class, parent, options)
+        self.events.append(('create', widget, options))
+        return widget
+
+    def when_shown(self, widget, function):
+        # recorded widgets are never shown and the binding isn't part of the
+        # program, lazy widgets are built with `Reconciler.expand`.
+        return
+
+    def count(self, kind):
+        return sum([1 for event in self.events if event[0] == kind])
@@ -0,0 +1,170 @@
+"""
+On-disk cache of compiled .tk files. The compiled `Program` of a file is
+pickled inside a `__tkcache__` folder next to the source (or inside
+TKSYSTEM_CACHE_DIR if set) keyed by the hash of its content, the version of
+tksystem and the python implementation, so an unchanged file skips the text
+pipeline entirely. Set TKSYSTEM_NO_CACHE to disable it.
+"""
+
+import hashlib
+import io
+import locale
+import marshal
+import mmap
+import os
+import pickle
+import sys
+import types
+
+from tksystem import __version__
+
+CACHE_FOLDER = '__tkcache__'
+EXTENSION = '.tkc'
+# bump it when the compiled format changes.
+FORMAT = 8
+
+
+class CacheStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def reset(self):
+        self.hits = self.misses = self.errors = 0
+
+    def __repr__(self):
+        return f'<CacheStats hits={self.hits} misses={self.misses} errors={self.errors}>'
+
+
+stats = CacheStats()
+
+
+def enabled():
+    return not os.environ.get('TKSYSTEM_NO_CACHE')
+
+
+def read_source(filename):
+    """Returns the content of the file as bytes-like object, mapped in memory
+    when possible so big files are not copied.
+    """
+    with open(filename, 'rb') as f:
+        try:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            return f.read()
+
+
+def encoding():
+    """Encoding of the .tk files, the one `open` uses by default."""
+    return locale.getpreferredencoding(False)
+
+
+def iter_lines(data):
+    """Yields the decoded lines of the data one by one without copying it,
+    mapped or not the lines are split and decoded the same way.
+    """
+    if not isinstance(data, mmap.mmap): data = io.BytesIO(data)
+    data.seek(0)
+    name = encoding()
+    for line in iter(data.readline, b''):
+        yield line.decode(name)
+
+
+def source_hash(data):
+    digest = hashlib.blake2b(data, digest_size=16)
+    digest.update(f'{__version__}:{FORMAT}:{sys.implementation.cache_tag}:{encoding()}'.encode())
+    return digest.hexdigest()
+
+
+def reduce_code(code):
+    return marshal.loads, (marshal.dumps(code), )
+
+
+def dumps(program):
+    """Pickles the program, code objects of compiled expressions are stored
+    with marshal since pickle can't handle them.
+    """
+    buffer = io.BytesIO()
+    pickler = pickle.Pickler(buffer, pickle.HIGHEST_PROTOCOL)
+    pickler.dispatch_table = {types.CodeType: reduce_code}
+    pickler.dump(program)
+    return buffer.getvalue()
+
+
+def cache_entry(filename):
+    """Folder of the cache entries of the file and the prefix of their names,
+    inside TKSYSTEM_CACHE_DIR files of different folders share it so the
+    hash of the absolute path is part of the name.
+    """
+    path = os.path.abspath(filename)
+    folder = os.environ.get('TKSYSTEM_CACHE_DIR')
+    if folder is None:
+        return os.path.join(os.path.dirname(path), CACHE_FOLDER), f'{os.path.basename(path)}.'
+    digest = hashlib.sha1(path.encode('utf-8', 'surrogateescape')).hexdigest()
+    return folder, f'{digest}-{os.path.basename(path)}.'
+
+
+def cache_path(filename, key):
+    folder, prefix = cache_entry(filename)
+    return os.path.join(folder, f'{prefix}{key}{EXTENSION}')
+
+
+def is_entry(name, prefix):
+    """Tells if `name` is an entry of the file with that prefix, whatever
+    its key, and not one of another file whose name starts the same.
+    """
+    if not name.startswith(prefix) or not name.endswith(EXTENSION): return False
+    key = name[len(prefix):-len(EXTENSION)]
+    return bool(key) and '.' not in key
+
+
+def get(filename, key):
+    path = cache_path(filename, key)
+    try:
+        with open(path, 'rb') as f:
+            program = pickle.load(f)
+    except FileNotFoundError:
+        stats.misses += 1
+        return None
+    except Exception:
+        stats.errors += 1
+        stats.misses += 1
+        return None
+    stats.hits += 1
+    return program
+
+
+def put(filename, key, program):
+    folder, prefix = cache_entry(filename)
+    name = f'{prefix}{key}{EXTENSION}'
+    path = os.path.join(folder, name)
+    try:
+        os.makedirs(folder, exist_ok=True)
+        temp = f'{path}.{os.getpid()}.tmp'
+        with open(temp, 'wb') as f:
+            f.write(dumps(program))
+        os.replace(temp, path)
+        for old in os.listdir(folder):
+            if old != name and is_entry(old, prefix):
+                os.remove(os.path.join(folder, old))
+    except OSError:
+        stats.errors += 1
+
+
+def load_program(filename, compile_source):
+    """Returns the compiled program of the given file and an error, using the
+    cache if possible, `compile_source(filename, lines)` is called on a miss.
+    """
+    data = read_source(filename)
+    try:
+        if not enabled():
+            return compile_source(filename, iter_lines(data))
+        key = source_hash(data)
+        if program := get(filename, key):
+            return program, None
+        program, error = compile_source(filename, iter_lines(data))
+        if error is None: put(filename, key, program)
+        return program, error
+    finally:
+        if isinstance(data, mmap.mmap): data.close()
@@ -0,0 +1,389 @@
+"""
+Compiler backend of TkSystem expressions. The AST built by `parser.Parser` is
+lowered into a python `ast.Expression` and compiled into a code object, so
+evaluating a property is a single `eval` instead of walking the tree with
+`parser.Interpreter`. Every python node remembers the TkSystem node it came
+from, runtime errors are mapped back to the same positions the interpreter
+would report. The interpreter is kept as fallback and for debugging, use
+`Expression.interpret` or set TKSYSTEM_INTERPRET to use it in `load`.
+"""
+
+import ast
+import operator
+import os
+
+from tksystem import parser
+
+FILENAME = '<TkSystem>'
+PREFIX = '_tk_'
+
+#######################################
+# BUILTINS
+#######################################
+
+def rgb(r, g, b):
+    if not all([isinstance(c, int) for c in [r, g, b]]):
+        raise TypeError('Arguments must be integers')
+    return f'#{r:02X}{g:02X}{b:02X}'
+
+
+BUILTINS = {
+    'True': 1,
+    'False': 0,
+    'None': None,
+    'rgb': rgb
+}
+
+#######################################
+# OPERATIONS
+#######################################
+
+# the operations of `parser.Value`: numbers operate with numbers, strings
+# and lists can be added to their own type and multiplied by an integer,
+# comparisons, `not`, `and` and `or` take numbers and give 1 or 0. Python
+# values are typed by `parser.wrap`, anything else is an illegal operation.
+
+def is_number(value):
+    return isinstance(value, (int, float))
+
+
+def illegal():
+    raise TypeError(parser.ILLEGAL_OPERATION)
+
+
+def plus(a, b):
+    if is_number(a) and is_number(b): return a + b
+    if isinstance(a, str) and isinstance(b, str): return a + b
+    if isinstance(a, list) and isinstance(b, list): return a + b
+    illegal()
+
+
+def minus(a, b):
+    if is_number(a) and is_number(b): return a - b
+    illegal()
+
+
+def mul(a, b):
+    if is_number(a) and is_number(b): return a * b
+    if isinstance(a, (str, list)) and isinstance(b, int): return a * b
+    illegal()
+
+
+def div(a, b):
+    if is_number(a) and is_number(b): return a / b
+    illegal()
+
+
+def power(a, b):
+    if is_number(a) and is_number(b): return a ** b
+    illegal()
+
+
+def negated(a):
+    return mul(a, -1)
+
+
+def comparison(function):
+    def compare(a, b):
+        if is_number(a) and is_number(b): return int(function(a, b))
+        illegal()
+    compare.__name__ = function.__name__
+    return compare
+
+
+def notted(a):
+    if is_number(a): return int(a == 0)
+    illegal()
+
+
+def anded(a, b):
+    if is_number(a) and is_number(b): return int(a and b)
+    illegal()
+
+
+def ored(a, b):
+    if is_number(a) and is_number(b): return int(a or b)
+    illegal()
+
+
+OPERATIONS = {
+    'PLUS': plus,
+    'MINUS': minus,
+    'MUL': mul,
+    'DIV': div,
+    'POWER': power,
+    'EE': comparison(operator.eq),
+    'NE': comparison(operator.ne),
+    'LT': comparison(operator.lt),
+    'GT': comparison(operator.gt),
+    'LTE': comparison(operator.le),
+    'GTE': comparison(operator.ge),
+    'and': anded,
+    'or': ored
+}
+
+# names the generated code needs, they can't clash with TkSystem names
+# because those are always prefixed.
+HELPERS = {function.__name__: function for function in [*OPERATIONS.values(), negated, notted]}
+
+#######################################
+# LOCATIONS
+#######################################
+
+class Location:
+    """Position of a TkSystem node and the message used if it fails."""
+    def __init__(self, start, end, details=None):
+        self.start = start
+        self.end = end
+        self.details = details
+
+#######################################
+# COMPILER
+#######################################
+
+class Compiler:
+    def __init__(self):
+        self.locations = []
+        self.names = {}
+        self.bound = []
+        self.defined = set()
+        self.pure = True
+        self.calls = False
+
+    def compile(self, node):
+        body = self.visit(node)
+        for name in self.defined:
+            self.names.pop(name, None)
+        tree = ast.fix_missing_locations(ast.Expression(body))
+        return compile(tree, FILENAME, 'eval')
+
+    def locate(self, py_node, start, end, details=None):
+        self.locations.append(Location(start, end, details))
+        py_node.lineno = py_node.end_lineno = len(self.locations)
+        py_node.col_offset = py_node.end_col_offset = 0
+        return py_node
+
+    def name(self, token):
+        name = token.value
+        if not any([name in bound for bound in self.bound]):
+            self.names.setdefault(name, len(self.locations))
+        return self.locate(
+            ast.Name(PREFIX + name, ast.Load()),
+            token.start, token.end, f"'{name}' is not defined"
+        )
+
+    def visit(self, node):
+        method = getattr(self, f'visit_{type(node).__name__}', self.no_visit_method)
+        return method(node)
+
+    def no_visit_method(self, node):
+        raise Exception(f'No visit_{type(node).__name__} method defined')
+
+    def visit_NumberNode(self, node):
+        return self.locate(ast.Constant(node.token.value), node.start, node.end)
+
+    def visit_StringNode(self, node):
+        return self.locate(ast.Constant(node.token.value), node.start, node.end)
+
+    def visit_VarAccessNode(self, node):
+        return self.name(node.name)
+
+    def operation(self, function, operands, node):
+        py_node = ast.Call(ast.Name(function.__name__, ast.Load()), operands, [])
+        return self.locate(py_node, node.start, node.end, parser.ILLEGAL_OPERATION)
+
+    def visit_BinOpNode(self, node):
+        # both operands are evaluated, `and` and `or` don't short-circuit.
+        left = self.visit(node.left_node)
+        right = self.visit(node.right_node)
+        op_token = node.op_token
+        key = op_token.value if op_token.type == 'KEYWORD' else op_token.type
+        return self.operation(OPERATIONS[key], [left, right], node)
+
+    def visit_UnaryOpNode(self, node):
+        operand = self.visit(node.node)
+        # unary plus is left out, the interpreter doesn't check its operand.
+        if node.op_token.type == 'PLUS': return operand
+        function = negated if node.op_token.type == 'MINUS' else notted
+        return self.operation(function, [operand], node)
+
+    def visit_FuncDefNode(self, node):
+        self.pure = False
+        arg_names = [arg.value for arg in node.args]
+        if node.name: self.defined.add(node.name.value)
+        self.bound.append(set(arg_names))
+        body = self.visit(node.body)
+        self.bound.pop()
+
+        arguments = ast.arguments(
+            posonlyargs=[], args=[ast.arg(PREFIX + name) for name in arg_names],
+            kwonlyargs=[], kw_defaults=[], defaults=[]
+        )
+        py_node = ast.Lambda(arguments, body)
+        if node.name:
+            target = ast.Name(PREFIX + node.name.value, ast.Store())
+            py_node = ast.NamedExpr(target, py_node)
+        return self.locate(py_node, node.start, node.end)
+
+    def visit_CallNode(self, node):
+        # calls inside a lambda are made later, by whoever calls it.
+        if not self.bound: self.calls = True
+        function = self.visit(node.node)
+        args = [self.visit(arg) for arg in node.args]
+        return self.locate(ast.Call(function, args, []), node.start, node.end)
+
+    def visit_ListNode(self, node):
+        elements = [self.visit(element) for element in node.elements]
+        return self.locate(ast.List(elements, ast.Load()), node.start, node.end)
+
+    def visit_DictNode(self, node):
+        keys = [self.visit(key) for key in node.keys]
+        values = [self.visit(value) for value in node.values]
+        return self.locate(ast.Dict(keys, values), node.start, node.end)
+
+    def visit_MethodAccessNode(self, node):
+        var_name = node.name.value
+        py_node = self.name(node.name)
+        for method in node.methods:
+            py_node = self.locate(
+                ast.Attribute(py_node, method.value, ast.Load()),
+                method.start, method.end, f"'{var_name}' has no method '{method.value}'"
+            )
+            var_name += f'.{method.value}'
+        if node.attribute:
+            attribute = node.attribute
+            py_node = self.locate(
+                ast.Subscript(py_node, ast.Constant(attribute.value), ast.Load()),
+                attribute.start, attribute.end, f"'{var_name}' has no attribute '{attribute.value}'"
+            )
+        return py_node
+
+#######################################
+# EXPRESSION
+#######################################
+
+class Expression:
+    """A compiled property value, keeps the original node to be able to run
+    it with the interpreter. Values that only use literals and builtins are
+    folded, `constant` keeps the result and `folded` tells if it is valid.
+    `calls` tells if evaluating it calls something, not only a lambda.
+    """
+    def __init__(self, node, code, names, locations, calls=False):
+        self.node = node
+        self.code = code
+        self.names = names
+        self.locations = locations
+        self.calls = calls
+        self.folded = False
+        self.constant = None
+        self.copy = None
+
+    def fold(self):
+        """Evaluates the expression once if it doesn't depend on the scope,
+        expressions that fail are left to fail when evaluated.
+        """
+        if not self.names.keys() <= BUILTINS.keys(): return
+        namespace = {'__builtins__': HELPERS}
+        for name in self.names:
+            namespace[PREFIX + name] = BUILTINS[name]
+        try:
+            self.constant = eval(self.code, namespace)
+        except Exception:
+            return
+        self.folded = True
+        if isinstance(self.constant, (list, dict)):
+            elements = self.constant.values() if isinstance(self.constant, dict) else self.constant
+            nested = any([isinstance(element, (list, dict)) for element in elements])
+            self.copy = thaw if nested else type(self.constant).copy
+
+    def evaluate(self, scope):
+        if self.folded and (not self.names or not any([name in scope for name in self.names])):
+            if self.copy is None: return self.constant, None
+            return self.copy(self.constant), None
+
+        namespace = {'__builtins__': HELPERS}
+        for name, index in self.names.items():
+            if name in scope: value = scope[name]
+            elif name in BUILTINS: value = BUILTINS[name]
+            else: return None, self.error(index, None)
+            namespace[PREFIX + name] = value
+
+        try:
+            return eval(self.code, namespace), None
+        except Exception as exception:
+            return None, self.runtime_error(exception)
+
+    def interpret(self, scope):
+        # names are checked first as `evaluate` does, even the ones that
+        # wouldn't be reached. They are copied out of the scope so lambdas
+        # keep the values of this evaluation, the scope of `load` changes
+        # `self` for every widget.
+        names = {}
+        for name, index in self.names.items():
+            if name in scope: names[name] = scope[name]
+            elif name not in BUILTINS: return None, self.error(index, None)
+        value, error = parser.evaluate(self.node, names)
+        if error: return None, error
+        return value.to_python(), None
+
+    def runtime_error(self, exception):
+        traceback = exception.__traceback__
+        index = None
+        while traceback is not None:
+            if traceback.tb_frame.f_code.co_filename == FILENAME:
+                index = traceback.tb_lineno - 1
+            traceback = traceback.tb_next
+        if index is None: raise exception
+        return self.error(index, exception)
+
+    def error(self, index, exception):
+        location = self.locations[index]
+        details = location.details
+        if isinstance(exception, ZeroDivisionError):
+            details = 'Division by Zero'
+        elif details is None:
+            details = str(exception)
+        return parser.RTError(
+            location.start, location.end,
+            details, parser.Context('<program>')
+        )
+
+    def __repr__(self):
+        return f'<Expression {self.node}>'
+
+
+def thaw(value):
+    """Copies folded lists and dicts so the constant can't be modified."""
+    if isinstance(value, list):
+        return [thaw(element) for element in value]
+    if isinstance(value, dict):
+        return {key: thaw(element) for key, element in value.items()}
+    return value
+
+
+def compile_node(node):
+    compiler = Compiler()
+    code = compiler.compile(node)
+    expression = Expression(node, code, compiler.names, compiler.locations, compiler.calls)
+    if compiler.pure: expression.fold()
+    return expression
+
+
+def compile_source(filename, text):
+    """Compiled expression of a property value and an error, the expression
+    is kept next to its tree in `parser.ast_cache` so a value repeated in a
+    file or compiled again (a reload) is compiled once. Empty values give
+    None.
+    """
+    key = (filename, text)
+    if expression := parser.ast_cache.get_compiled(key):
+        return expression, None
+    node, error = parser.parse(filename, text)
+    if error or node is None: return None, error
+    expression = compile_node(node)
+    parser.ast_cache.put_compiled(key, expression)
+    return expression, None
+
+
+def use_interpreter():
+    return bool(os.environ.get('TKSYSTEM_INTERPRET'))
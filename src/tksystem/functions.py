@@ -1,47 +1,40 @@
-from tksystem.parser import run
-import pylejandria
-import tkinter as tk
-from tkinter import ttk
+from collections import ChainMap
+from time import perf_counter
+from types import MappingProxyType
+from tksystem import cache
+from tksystem.backends import TkBackend
+from tksystem.compiler import use_interpreter
+from tksystem.program import compile_lines, iter_widgets
+from tksystem.reconcile import Reconciler, attach, make_tree, reconciler_of
+from tksystem.registry import registry as default_registry
+from tksystem.stats import default_stats, emit as emit_stats
 
 
-def import_widget(name, module):
-    for source in (module, pylejandria.gui, tk, ttk):
-        if widget := source.__dict__.get(name):
-            return widget
-    raise AttributeError(f'Not widget {name!a} founded.')
+def import_widget(name, module, registry=None):
+    if registry is None: registry = default_registry
+    return registry.resolve(name, module)
 
 
 def parse_file(text):
-    start_index = 0
+    if isinstance(text, str): text = text.splitlines()
     widget_properties = []
-    key_points = [line for line in text if ':' not in line] + [None]
-    print(f'{key_points=}')
-    for point_a, point_b in pylejandria.tools.pair(key_points, 2):
-        widget_properties.append({})
-        index_a = text.index(point_a, start_index)
-        index_b = text.index(point_b, start_index) if point_b else len(text)
-        widget_properties[-1]['widget'] = text[index_a].strip()
-        widget_properties[-1]['indent'] = text[index_a].count('\t')
-        for index in range(index_a+1, index_b):
-            line = text[index].strip()
-            print(index, line)
-            key, value = line.split(':', maxsplit=1)
-            widget_properties[-1][key] = value
-        start_index = index_b
+    for record in iter_widgets(text):
+        widget_properties.append({'widget': record.name, 'indent': record.indent})
+        for prop in record.properties:
+            widget_properties[-1][prop.key] = prop.source
     return widget_properties
 
 
 def assign_parent(widget_a, widget_b, indent_a):
-    indent_b = widget_b['indent']
+    """Parent of the widget `widget_b` (a dict of `parse_file` or a record)
+    that comes right after `widget_a`, whose indent is `indent_a`. `load`
+    nests the widgets with `make_tree` instead.
+    """
+    indent_b = widget_b['indent'] if isinstance(widget_b, dict) else widget_b.indent
     parent = widget_a
-    
-    if indent_a < indent_b:
-        return parent
-    if indent_a == indent_b:
-        return parent.master
-    for _ in range(indent_b - indent_a):
+    for _ in range(indent_a - indent_b + 1):
         parent = parent.master
-    return parent.master
+    return parent
 
 
 def clean(text):
@@ -67,54 +60,133 @@ def make_error(error, line):
     return error.as_string(line)
 
 
-def load(tk_filename, file):
-    module = pylejandria.tools.get_module(file) if file is not None else None
-    module_dict = {key:getattr(module, key) for key in dir(module)}
-
-    with open(tk_filename, 'r') as f:
-        tk_text = f.read()
-    
-    clean_text = clean(tk_text)
-    widget_properties = parse_file(clean_text)
-    main = None
-    line_count = 1
-
-    for index in range(len(widget_properties)):
-        line_count += 1
-        widget_a = widget_properties[index]
-        widget_b = widget_properties[index + 1] if index + 1 < len(widget_properties) else None
-        indent_a = widget_a.pop('indent')
-        widget_name = widget_a.pop('widget')
-        widget_class = import_widget(widget_name, module)
-
-        widget = widget_class() if main is None else widget_class(widget_a.pop('parent'))
-
-        id_widgets = {}
-
-        for key, str_value in widget_a.items():
-            value, error = run('<TkSystem>', str_value, {'self': widget} | id_widgets | module_dict)
-            if error: return None, make_error(error, line_count)
-            value = value.to_python()
-            if key == 'id': id_widgets[value] = widget
-            elif key == 'execute':
-                function, args, kwargs = value
-                function(*args, **kwargs)
-            elif key.startswith('.'):
-                method = getattr(widget, key[1:])
-                if isinstance(value, list): method(*value)
-                elif isinstance(value, dict): method(**value)
-                else: method(value)
-            else: widget[key] = value
-            line_count += 1
-        
-        if main is None:
-            main = widget
-        
-        if widget_b is not None:
-            parent = assign_parent(widget, widget_b, indent_a)
-            widget_b['parent'] = parent
-
-    return main, None
+def resolve_names(module, names, stats=None):
+    """Looks up in the module only the names the .tk file references."""
+    if module is None: return {}
+    if stats: start = perf_counter()
+    namespace = MappingProxyType(vars(module))
+    module_names = {name: namespace[name] for name in names if name in namespace}
+    if stats:
+        stats.add('names', start)
+        stats.names_resolved += len(module_names)
+        stats.names_missing += len(names) - len(module_names)
+    return module_names
+
+
+def load_program(tk_filename, stats=None):
+    """Compiled program of the file, the time spent compiling is measured
+    apart from reading the file and the cache.
+    """
+    if not stats: return cache.load_program(tk_filename, compile_lines)
+    start = perf_counter()
+    compile_time = stats.time('compile')
+
+    def compile_source(filename, lines):
+        compile_start = perf_counter()
+        try:
+            return compile_lines(filename, lines)
+        finally:
+            stats.add('compile', compile_start)
+
+    result = cache.load_program(tk_filename, compile_source)
+    # the time spent compiling is left out of reading.
+    stats.add('read', start + stats.time('compile') - compile_time)
+    return result
+
+
+def resolve_widgets(program, registry, module, stats=None):
+    """Classes of the widgets of the program by name and an error, the first
+    name that is not found with its line.
+    """
+    if stats: start = perf_counter()
+    widget_classes = {}
+    for record in program.records:
+        if record.name in widget_classes: continue
+        try:
+            widget_classes[record.name] = registry.resolve(record.name, module)
+        except AttributeError as exception:
+            return None, f'{exception} File {program.filename}, line {record.line}'
+    if stats: stats.add('resolve', start, len(widget_classes))
+    return widget_classes, None
+
+
+def load(tk_filename, file, interpret=None, stats=None, registry=None, backend=None):
+    """Builds the widgets of the .tk file, returns the main widget and an
+    error. Pass a `LoadStats` as `stats` (or set TKSYSTEM_STATS) to measure
+    the phases of the load, a `LineProfile` (or TKSYSTEM_PROFILE) to measure
+    its lines too. The main widget keeps the tree it was built from, `apply`
+    updates it with a new text.
+    """
+    if stats is None: stats = default_stats()
+    if stats:
+        start = perf_counter()
+        stats.filename = tk_filename
+        stats.begin()
+    if interpret is None: interpret = use_interpreter()
+    if registry is None: registry = default_registry
+    if backend is None: backend = TkBackend()
+    module = None
+    try:
+        if file is not None:
+            if stats: module_start = perf_counter()
+            from pylejandria.tools import get_module
+            module = get_module(file)
+            if stats: stats.add('module', module_start)
+
+        program, error = load_program(tk_filename, stats)
+        if error: return None, make_error(*error)
+        module_dict = resolve_names(module, program.names, stats)
+        widget_classes, error = resolve_widgets(program, registry, module, stats)
+        if error: return None, error
+
+        # names are looked up in the current widget, the ids, the module and
+        # at last the builtins of the evaluator, only `self` changes per widget.
+        scope = ChainMap({'self': None}, {}, module_dict)
+        widgets = []
+        window, error = backend.build(program, scope, widget_classes, interpret, stats, widgets)
+        if error: return None, error
+        root = make_tree(program.records, widgets)
+        if root is not None:
+            attach(window, Reconciler(root, scope, backend, interpret, registry, module, widget_classes))
+        return window, None
+    finally:
+        if stats:
+            stats.stop_counting()
+            stats.add('total', start)
+            stats.finish()
+            emit_stats(stats)
+
+
+def reconcile(reconciler, program, swapped=()):
+    """Applies the program to the window of the reconciler, returns the
+    `TreeChanges` and an error.
+    """
+    if not program.records: return None, 'The text has no widgets'
+    widget_classes, error = resolve_widgets(program, reconciler.registry, reconciler.module)
+    if error: return None, error
+    module_names = resolve_names(reconciler.module, program.names)
+    return reconciler.apply(program, widget_classes, module_names, swapped)
+
+
+def apply(window, tk_text, filename='<TkSystem>'):
+    """Updates the widgets of a window made by `load` to the new .tk text
+    instead of building them again, only what changed is sent to tk. Returns
+    the `TreeChanges` and an error, with an error the widgets are left as
+    they were: the ones created before it are destroyed, only the options
+    already set on the kept widgets when a value fails to evaluate stay.
+    """
+    reconciler = reconciler_of(window)
+    if reconciler is None: return None, 'The window was not made by load'
+    if isinstance(tk_text, str): tk_text = tk_text.splitlines()
+    # only the values edited since the last apply are compiled.
+    expressions = {
+        prop.source: prop.expression
+        for node in reconciler.root.walk() for prop in node.record.properties
+        if prop.expression is not None
+    }
+    program, error = compile_lines(filename, tk_text, expressions)
+    if error: return None, make_error(*error)
+    return reconcile(reconciler, program)
 
 if __name__ == '__main__':
     window, error = load('c:/users/angel/desktop/tksystem/project.tk', __file__)
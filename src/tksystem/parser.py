@@ -1,5 +1,7 @@
+from bisect import bisect_right
+from collections import OrderedDict
 from string import ascii_letters as LETTERS
-from tkinter import TclError, Tk
+import re
 
 ##### VARIABLES #####
 DIGITS = '0123456789'
@@ -113,181 +115,166 @@ class RTError(Error):
         return f'Traceback (most recent call last): \n{result}'
 
 #######################################
-# TOKEN
+# POSITION
 #######################################
 
-class Token:
-    def __init__(self, type_, value=None, start=None, end=None):
-        self.type = type_
-        self.value = value
+class Source:
+    """Text being lexed, the offsets where each line starts are computed only
+    when a position needs its line or column, usually to render an error.
+    """
+    __slots__ = ('filename', 'text', 'line_offsets')
 
-        if start:
-            self.start = start.copy()
-            self.end = self.start.copy()
-            self.end.advance()
-        
-        if end:
-            self.end = end.copy()
-    
-    def matches(self, type_, value):
-        return self.type == type_ and self.value == value
-    
-    def __repr__(self):
-        if self.value: return f'{self.type}:{self.value}'
-        return f'{self.type}'
+    def __init__(self, filename, text):
+        self.filename = filename
+        self.text = text
+        self.line_offsets = None
+
+    def locate(self, index):
+        if self.line_offsets is None:
+            self.line_offsets = [0] + [match.end() for match in NEWLINE_REGEX.finditer(self.text)]
+        line = bisect_right(self.line_offsets, index) - 1
+        return line, index - self.line_offsets[line]
 
-#######################################
-# POSITION
-#######################################
 
 class Position:
-    def __init__(self, index, line, column, filename, filetext):
+    __slots__ = ('index', 'source')
+
+    def __init__(self, index, source):
         self.index = index
-        self.line = line
-        self.column = column
-        self.filename = filename
-        self.filetext = filetext
-    
+        self.source = source
+
+    @property
+    def line(self):
+        return self.source.locate(self.index)[0]
+
+    @property
+    def column(self):
+        return self.source.locate(self.index)[1]
+
+    @property
+    def filename(self):
+        return self.source.filename
+
+    @property
+    def filetext(self):
+        return self.source.text
+
     def advance(self, current_char=None):
         self.index += 1
-        self.column += 1
-        if current_char == '\n':
-            self.line += 1
-            self.column = 0
         return self
-    
+
     def recede(self):
         self.index -= 1
-        self.column -= 1
         return self
-    
+
     def copy(self):
-        return Position(self.index, self.line, self.column, self.filename, self.filetext)
+        return Position(self.index, self.source)
 
 #######################################
-# LEXER
+# TOKEN
 #######################################
 
-class Lexer:
-    def __init__(self, filename, text):
-        self.filename = filename
-        self.text = text
-        self.pos = Position(-1, 0, -1, filename, text)
-        self.current_char = None
-        self.advance()
-    
-    def advance(self):
-        self.pos.advance(self.current_char)
-        self.current_char = self.text[self.pos.index] if self.pos.index < len(self.text) else None
-    
-    def make_number(self):
-        num_str = ''
-        dot_count = 0
-        start = self.pos.copy()
-
-        while self.current_char != None and self.current_char in DIGITS + '.':
-            if self.current_char == '.':
-                if dot_count == 1: break
-                dot_count += 1
-                num_str += '.'
-            else:
-                num_str += self.current_char
-            self.advance()
-        
-        if dot_count == 0:
-            return Token('INT', int(num_str), start=start, end=self.pos)
-        return Token('FLOAT', float(num_str), start=start, end=self.pos)
-    
-    def make_identifier(self):
-        id_str = ''
-        start = self.pos.copy()
-        
-        while self.current_char != None and self.current_char in LETTERS_DIGITS + '_':
-            id_str += self.current_char
-            self.advance()
-        
-        token_type = 'KEYWORD' if id_str in KEYWORDS else 'IDENTIFIER'
-        return Token(token_type, id_str, start, self.pos)
+class Token:
+    __slots__ = ('type', 'value', 'start_index', 'end_index', 'source')
 
-    def make_operator(self):
-        start = self.pos.copy()
-        op_str = self.current_char
-        self.advance()
+    def __init__(self, type_, value=None, start_index=0, end_index=None, source=None):
+        self.type = type_
+        self.value = value
+        self.start_index = start_index
+        self.end_index = start_index + 1 if end_index is None else end_index
+        self.source = source
 
-        while self.current_char != None and op_str + self.current_char in COMPOSITE.keys():
-            op_str += self.current_char
-            self.advance()
-        
-        if op_str in ('!', ):
-            return None, InvalidSyntaxError(start, self.pos, "Expected '!=' or '=='")
+    @property
+    def start(self):
+        return Position(self.start_index, self.source)
 
-        return Token(COMPOSITE.get(op_str), start=start, end=self.pos), None
+    @property
+    def end(self):
+        return Position(self.end_index, self.source)
+
+    def matches(self, type_, value):
+        return self.type == type_ and self.value == value
     
-    def make_string(self, quote):
-        string = ''
-        start = self.pos.copy()
-        escape = False
-        self.advance()
+    def __repr__(self):
+        if self.value: return f'{self.type}:{self.value}'
+        return f'{self.type}'
 
-        while self.current_char != quote and self.current_char != None:
-            if escape:
-                string += ESCAPE_CHARACTERS.get(self.current_char, self.current_char)
-            elif self.current_char == '\\':
-                escape = True
-            else:
-                string += self.current_char
-            self.advance()
-            escape = False
-        
-        if self.current_char != quote:
-            return None, InvalidSyntaxError(start, self.pos, f"Expected {quote}")
-        
-        self.advance()
-        return Token('STRING', string, start, self.pos), None
+#######################################
+# LEXER
+#######################################
 
-    def skip_comment(self):
-        self.advance()
-        while self.current_char:
-            self.advance()
-        self.advance()
+TOKEN_REGEX = re.compile(r'''
+    (?P<SPACE>[ \t]+)
+  | (?P<NUMBER>[0-9]+(?:\.[0-9]*)?)
+  | (?P<IDENTIFIER>[A-Za-z_][A-Za-z0-9_]*)
+  | (?P<STRING>"[^"\\]*(?:\\.[^"\\]*)*"|\'[^\'\\]*(?:\\.[^\'\\]*)*\')
+  | (?P<OPERATOR>->|<=|>=|!=|==|[-+*/()\[\]{}^,:<>=!])
+  | (?P<DOT>\.)
+  | (?P<COMMENT>\#.*)
+  | (?P<UNCLOSED>["\'])
+  | (?P<ILLEGAL>.)
+''', re.VERBOSE | re.DOTALL)
+
+ESCAPE_REGEX = re.compile(r'\\(.)', re.DOTALL)
+NEWLINE_REGEX = re.compile('\n')
+
+
+def unescape(match):
+    char = match.group(1)
+    return ESCAPE_CHARACTERS.get(char, char)
+
+
+class Lexer:
+    def __init__(self, filename, text):
+        self.filename = filename
+        self.text = text
+        self.source = Source(filename, text)
 
     def make_tokens(self):
         tokens = []
-
-        while self.current_char is not None:
-            if self.current_char in ' \t':
-                self.advance()
-            elif self.current_char in OPERATORS.keys():
-                tokens.append(Token(OPERATORS[self.current_char], start=self.pos))
-                self.advance()
-            elif self.current_char in DIGITS:
-                tokens.append(self.make_number())
-            elif self.current_char in LETTERS_DIGITS + '_':
-                tokens.append(self.make_identifier())
-            elif self.current_char in COMPOSITE.keys():
-                token, error = self.make_operator()
-                if error: return [], error
-                tokens.append(token)
-            elif self.current_char == '"':
-                token, error = self.make_string('"')
-                if error: return [], error
-                tokens.append(token)
-            elif self.current_char == "'":
-                token, error = self.make_string("'")
-                if error: return [], error
-                tokens.append(token)
-            elif self.current_char == '#':
-                self.skip_comment()
-            elif self.current_char == '.':
-                tokens.append(Token('DOT', start=self.pos))
-                self.advance()
+        source = self.source
+
+        for match in TOKEN_REGEX.finditer(self.text):
+            kind = match.lastgroup
+            start, end = match.span()
+
+            if kind == 'SPACE' or kind == 'COMMENT':
+                continue
+            elif kind == 'OPERATOR':
+                op_str = match.group()
+                if op_str == '!':
+                    return [], InvalidSyntaxError(
+                        Position(start, source), Position(end, source),
+                        "Expected '!=' or '=='"
+                    )
+                token_type = OPERATORS.get(op_str) or COMPOSITE[op_str]
+                tokens.append(Token(token_type, None, start, end, source))
+            elif kind == 'NUMBER':
+                text = match.group()
+                if '.' in text: tokens.append(Token('FLOAT', float(text), start, end, source))
+                else: tokens.append(Token('INT', int(text), start, end, source))
+            elif kind == 'IDENTIFIER':
+                text = match.group()
+                token_type = 'KEYWORD' if text in KEYWORDS else 'IDENTIFIER'
+                tokens.append(Token(token_type, text, start, end, source))
+            elif kind == 'STRING':
+                string = self.text[start + 1:end - 1]
+                if '\\' in string: string = ESCAPE_REGEX.sub(unescape, string)
+                tokens.append(Token('STRING', string, start, end, source))
+            elif kind == 'DOT':
+                tokens.append(Token('DOT', None, start, end, source))
+            elif kind == 'UNCLOSED':
+                return [], InvalidSyntaxError(
+                    Position(start, source), Position(len(self.text), source),
+                    f"Expected {match.group()}"
+                )
             else:
-                start = self.pos.copy()
-                char = self.current_char
-                self.advance()
-                return [], IllegalCharError(start, self.pos, f"'{char}'")
+                return [], IllegalCharError(
+                    Position(start, source), Position(end, source),
+                    f"'{match.group()}'"
+                )
 
-        tokens.append(Token('EOF', start=self.pos))
+        tokens.append(Token('EOF', None, len(self.text), None, source))
         return tokens, None
 
 #######################################
@@ -295,98 +282,158 @@ class Lexer:
 #######################################
 
 class NumberNode:
+    __slots__ = ('token', )
+
     def __init__(self, token):
         self.token = token
-        self.start = self.token.start
-        self.end = self.token.end
+
+    @property
+    def start(self):
+        return self.token.start
+
+    @property
+    def end(self):
+        return self.token.end
     
     def __repr__(self):
         return f'{self.token}'
 
 
 class StringNode:
+    __slots__ = ('token', )
+
     def __init__(self, token):
         self.token = token
-        self.start = self.token.start
-        self.end = self.token.end
+
+    @property
+    def start(self):
+        return self.token.start
+
+    @property
+    def end(self):
+        return self.token.end
     
     def __repr__(self):
         return f'{self.token}'
 
 
 class BinOpNode:
+    __slots__ = ('left_node', 'op_token', 'right_node')
+
     def __init__(self, left_node, op_token, right_node):
         self.left_node = left_node
         self.op_token = op_token
         self.right_node = right_node
-        self.start = self.left_node.start
-        self.end = self.right_node.end
+
+    @property
+    def start(self):
+        return self.left_node.start
+
+    @property
+    def end(self):
+        return self.right_node.end
     
     def __repr__(self):
         return f'({self.left_node}, {self.op_token}, {self.right_node})'
 
 
 class UnaryOpNode:
+    __slots__ = ('op_token', 'node')
+
     def __init__(self, op_token, node):
         self.op_token = op_token
         self.node = node
-        self.start = self.op_token.start
-        self.end = self.node.end
+
+    @property
+    def start(self):
+        return self.op_token.start
+
+    @property
+    def end(self):
+        return self.node.end
     
     def __repr__(self):
         return f'({self.op_token}, {self.node})'
 
 
 class VarAccessNode:
+    __slots__ = ('name', )
+
     def __init__(self, var_name):
         self.name = var_name
-        self.start = self.name.start
-        self.end = self.name.end
+
+    @property
+    def start(self):
+        return self.name.start
+
+    @property
+    def end(self):
+        return self.name.end
 
 
 class MethodAccessNode:
+    __slots__ = ('name', 'methods', 'attribute')
+
     def __init__(self, var_name, methods, attribute=None):
         self.name = var_name
         self.methods = methods
         self.attribute = attribute
-        self.start = self.name.start
+
+    @property
+    def start(self):
+        return self.name.start
+
+    @property
+    def end(self):
         if self.attribute:
-            self.end = self.attribute.end
+            return self.attribute.end
         elif self.methods:
-            self.end = self.methods[-1].end
-        else:
-            self.end = self.name.end
+            return self.methods[-1].end
+        return self.name.end
 
 
 class FuncDefNode:
+    __slots__ = ('name', 'args', 'body')
+
     def __init__(self, var_name, args_name, body_node):
         self.name = var_name
         self.args = args_name
         self.body = body_node
 
+    @property
+    def start(self):
         if self.name:
-            self.start = self.name.start
+            return self.name.start
         elif len(self.args) > 0:
-            self.start = self.args[0].start
-        else:
-            self.start = self.body.start
-        
-        self.end = self.body.end
+            return self.args[0].start
+        return self.body.start
+
+    @property
+    def end(self):
+        return self.body.end
 
 
 class CallNode:
+    __slots__ = ('node', 'args')
+
     def __init__(self, node, arg_nodes):
         self.node = node
         self.args = arg_nodes
 
-        self.start = self.node.start
+    @property
+    def start(self):
+        return self.node.start
+
+    @property
+    def end(self):
         if len(self.args) > 0:
-            self.end = self.args[-1].end
-        else:
-            self.end = self.node.end
+            return self.args[-1].end
+        return self.node.end
 
 
 class ListNode:
+    __slots__ = ('elements', 'start', 'end')
+
     def __init__(self, elements, start, end):
         self.elements = elements
         self.start = start
@@ -394,6 +441,8 @@ class ListNode:
 
 
 class DictNode:
+    __slots__ = ('keys', 'values', 'start', 'end')
+
     def __init__(self, keys, values, start, end):
         self.keys = keys
         self.values = values
@@ -859,185 +908,162 @@ class Parser:
 
 
 #######################################
-# RUNTIME RESULT
+# VALUES
 #######################################
 
-class RTResult:
-    def __init__(self):
-        self.value = None
-        self.error = None
-    
-    def register(self, res):
-        if res.error: self.error = res.error
-        return res.value
-    
-    def success(self, value):
-        self.value = value
-        return self
-    
-    def failure(self, error):
-        self.error = error
-        return self
+# Values are immutable, the position and context of an operation belong to
+# the node being visited, so the interpreter shares them instead of copying.
+# Operations return the result and the details of the error if they failed,
+# `compiler` lowers them to functions with the same rules.
+
+ILLEGAL_OPERATION = 'Illegal operation'
+
+
+def wrap(value):
+    """Value of a python object, numbers, strings and lists are values of
+    their TkSystem type.
+    """
+    if isinstance(value, (int, float)): return Number(value)
+    if isinstance(value, str): return String(value)
+    if isinstance(value, list): return List([wrap(element) for element in value])
+    return Variable(value)
 
-#######################################
-# VALUES
-#######################################
 
 class Value:
-    def __init__(self):
-        self.set_pos()
-        self.set_context()
-    
-    def set_pos(self, start=None, end=None):
-        self.start = start
-        self.end = end
-        return self
-    
-    def set_context(self, context=None):
-        self.context = context
-        return self
-    
+    __slots__ = ()
+
     def plus(self, other):
-        return None, self.illegal_operation(other)
+        return None, ILLEGAL_OPERATION
     
     def minus(self, other):
-        return None, self.illegal_operation(other)
+        return None, ILLEGAL_OPERATION
     
     def mul(self, other):
-        return None, self.illegal_operation(other)
+        return None, ILLEGAL_OPERATION
 
     def power(self, other):
-        return None, self.illegal_operation(other)
+        return None, ILLEGAL_OPERATION
     
     def div(self, other):
-        return None, self.illegal_operation(other)
+        return None, ILLEGAL_OPERATION
     
     def ee(self, other):
-        return None, self.illegal_operation(other)
+        return None, ILLEGAL_OPERATION
     
     def ne(self, other):
-        return None, self.illegal_operation(other)
+        return None, ILLEGAL_OPERATION
         
     def lt(self, other):
-        return None, self.illegal_operation(other)
+        return None, ILLEGAL_OPERATION
     
     def gt(self, other):
-        return None, self.illegal_operation(other)
+        return None, ILLEGAL_OPERATION
     
     def lte(self, other):
-        return None, self.illegal_operation(other)
+        return None, ILLEGAL_OPERATION
     
     def gte(self, other):
-        return None, self.illegal_operation(other)
+        return None, ILLEGAL_OPERATION
 
     def notted(self):
-        return None, self.illegal_operation()
+        return None, ILLEGAL_OPERATION
     
-    def anded(self):
-        return None, self.illegal_operation()
+    def anded(self, other):
+        return None, ILLEGAL_OPERATION
     
-    def ored(self):
-        return None, self.illegal_operation()
+    def ored(self, other):
+        return None, ILLEGAL_OPERATION
 
-    def illegal_operation(self, other=None):
-        if not other: other = self
-        return RTError(
-            self.start, other.end,
-            'Illegal operation',
-            self.context
-        )
+    def copy(self):
+        return self
 
     def to_python(self):
         return None
 
-    def get_method(self, attribute):
-        return None
+    def get_method(self, method):
+        try:
+            return wrap(getattr(self.to_python(), method))
+        except Exception:
+            return None
 
 
 class Number(Value):
+    __slots__ = ('value', )
+
     def __init__(self, value):
-        super().__init__()
         self.value = value
 
     def plus(self, other):
         if isinstance(other, Number):
-            return Number(self.value + other.value).set_context(self.context), None
-        return None, self.illegal_operation(other.end)
+            return Number(self.value + other.value), None
+        return None, ILLEGAL_OPERATION
     
     def minus(self, other):
         if isinstance(other, Number):
-            return Number(self.value - other.value).set_context(self.context), None
-        return None, self.illegal_operation(other.end)
+            return Number(self.value - other.value), None
+        return None, ILLEGAL_OPERATION
     
     def mul(self, other):
         if isinstance(other, Number):
-            return Number(self.value * other.value).set_context(self.context), None
-        return None, self.illegal_operation(other.end)
+            return Number(self.value * other.value), None
+        return None, ILLEGAL_OPERATION
     
     def power(self, other):
         if isinstance(other, Number):
-            return Number(self.value ** other.value).set_context(self.context), None
-        return None, self.illegal_operation(other.end)
+            if self.value == 0 and other.value < 0:
+                return None, 'Division by Zero'
+            return Number(self.value ** other.value), None
+        return None, ILLEGAL_OPERATION
     
     def div(self, other):
         if isinstance(other, Number):
             if other.value == 0:
-                return None, RTError(
-                    other.start, other.end,
-                    'Division by Zero',
-                    self.context
-                )
-            return Number(self.value / other.value).set_context(self.context), None
-        return None, self.illegal_operation(other.end)
+                return None, 'Division by Zero'
+            return Number(self.value / other.value), None
+        return None, ILLEGAL_OPERATION
     
     def ee(self, other):
         if isinstance(other, Number):
-            return Number(int(self.value == other.value)).set_context(self.context), None
-        return None, self.illegal_operation(other.end)
+            return boolean(self.value == other.value), None
+        return None, ILLEGAL_OPERATION
     
     def ne(self, other):
         if isinstance(other, Number):
-            return Number(int(self.value != other.value)).set_context(self.context), None
-        return None, self.illegal_operation(other.end)
+            return boolean(self.value != other.value), None
+        return None, ILLEGAL_OPERATION
         
     def lt(self, other):
         if isinstance(other, Number):
-            return Number(int(self.value < other.value)).set_context(self.context), None
-        return None, self.illegal_operation(other.end)
+            return boolean(self.value < other.value), None
+        return None, ILLEGAL_OPERATION
     
     def gt(self, other):
         if isinstance(other, Number):
-            return Number(int(self.value > other.value)).set_context(self.context), None
-        return None, self.illegal_operation(other.end)
+            return boolean(self.value > other.value), None
+        return None, ILLEGAL_OPERATION
     
     def lte(self, other):
         if isinstance(other, Number):
-            return Number(int(self.value <= other.value)).set_context(self.context), None
-        return None, self.illegal_operation(other.end)
+            return boolean(self.value <= other.value), None
+        return None, ILLEGAL_OPERATION
     
     def gte(self, other):
         if isinstance(other, Number):
-            return Number(int(self.value >= other.value)).set_context(self.context), None
-        return None, self.illegal_operation(other.end)
+            return boolean(self.value >= other.value), None
+        return None, ILLEGAL_OPERATION
     
     def notted(self):
-        return Number(0 if self.value != 0 else 1).set_context(self.context), None
+        return boolean(self.value == 0), None
 
     def ored(self, other):
         if isinstance(other, Number):
-            return Number(int(self.value or other.value)).set_context(self.context), None
-        return None, self.illegal_operation(other)
+            return Number(int(self.value or other.value)), None
+        return None, ILLEGAL_OPERATION
     
     def anded(self, other):
         if isinstance(other, Number):
-            return Number(int(self.value and other.value)).set_context(self.context), None
-        return None, self.illegal_operation(other)
-
-    def copy(self):
-        copy = Number(self.value)
-        copy.set_pos(self.start, self.end)
-        copy.set_context(self.context)
-        return copy
+            return Number(int(self.value and other.value)), None
+        return None, ILLEGAL_OPERATION
     
     def __repr__(self):
         return str(self.value)
@@ -1046,140 +1072,126 @@ class Number(Value):
         return self.value
 
 
+TRUE = Number(1)
+FALSE = Number(0)
+
+
+def boolean(condition):
+    return TRUE if condition else FALSE
+
+
+class CallbackError(Exception):
+    """Error of a function called from python, `error` is the RTError."""
+    def __init__(self, error):
+        super().__init__(error.as_string())
+        self.error = error
+
+
 class BaseFunction(Value):
+    __slots__ = ('name', )
+
     def __init__(self, name):
-        super().__init__()
         self.name = name or '<lambda>'
     
-    def generate_new_context(self):
-        new_context = Context(self.name, self.context, self.start)
-        new_context.symbol_table = SymbolTable(new_context.parent.symbol_table)
-        return new_context
-    
     def check_args(self, arg_names, args):
-        res = RTResult()
         if len(args) > len(arg_names):
-            return res.failure(RTError(
-                self.start, self.end,
-                f"too many args passed into '{self.name}. Expected {len(arg_names)}'",
-                self.context
-            ))
-        
+            return f"too many args passed into '{self.name}. Expected {len(arg_names)}'"
         if len(args) < len(arg_names):
-            return res.failure(RTError(
-                self.start, self.end,
-                f"too few args passed into '{self.name}. Expected {len(arg_names)}'",
-                self.context
-            ))
+            return f"too few args passed into '{self.name}. Expected {len(arg_names)}'"
+        return None
 
-        return res.success(None)
+    def call_error(self, node, details, context):
+        return RTError(node.start, node.end, details, Context(self.name, context, node.start))
 
-    def populate_args(self, arg_names, args, context):
-        for arg_name, arg_value in zip(arg_names, args):
-            arg_value.set_context(context)
-            context.symbol_table.set(arg_name, arg_value)
-        
-    def check_and_populate(self, arg_names, args, context):
-        res = RTResult()
-        res.register(self.check_args(arg_names, args))
-        if res.error: return res
-        self.populate_args(arg_names, args, context)
-        return res.success(None)
 
 
 class Function(BaseFunction):
-    def __init__(self, name, body, args):
+    __slots__ = ('body', 'args', 'context')
+
+    def __init__(self, name, body, args, context):
         super().__init__(name)
         self.body = body
         self.args = args
+        self.context = context
     
-    def execute(self, args):
-        res = RTResult()
-        interpreter = Interpreter()
-        new_context = self.generate_new_context()
-
-        res.register(self.check_and_populate(self.args, args, new_context))
-        if res.error: return res
-        
-        value = res.register(interpreter.visit(self.body, new_context))
-        if res.error: return res
-        return res.success(value)
-    
-    def copy(self):
-        copy = Function(self.name, self.body, self.args)
-        copy.set_context(self.context)
-        copy.set_pos(self.start, self.end)
-        return copy
+    def execute(self, args, context, node):
+        """Runs the body in a new context whose symbols are the arguments and
+        whose parent table is the one of the context the function was
+        defined in, `context` is the caller and `node` the call being made.
+        """
+        if details := self.check_args(self.args, args):
+            return None, self.call_error(node, details, context)
+        symbol_table = SymbolTable(self.context.symbol_table, dict(zip(self.args, args)))
+        return interpreter.visit(self.body, Context(self.name, context, node.start, symbol_table))
     
     def __repr__(self):
         return f"<Function '{self.name}'>"
 
+    def to_python(self):
+        """Python function running the body, errors are raised as
+        `CallbackError`.
+        """
+        def function(*args):
+            value, error = self.execute([wrap(arg) for arg in args], self.context, self.body)
+            if error: raise CallbackError(error)
+            return value.to_python()
+        function.__name__ = self.name
+        return function
+
 
 class BuiltInFunction(BaseFunction):
+    __slots__ = ()
+
     def __init__(self, name):
         super().__init__(name)
     
-    def execute(self, args):
-        res = RTResult()
-        context = self.generate_new_context()
-        method_name = f'execute_{self.name}'
-        method = getattr(self, method_name, self.no_visit_method)
-        res.register(self.check_and_populate(method.arg_names, args, context))
-        if res.error: return res
-        return_value = res.register(method(context))
-        if res.error: return res
-        return res.success(return_value)
+    def execute(self, args, context, node):
+        method = getattr(self, f'execute_{self.name}', self.no_visit_method)
+        if details := self.check_args(method.arg_names, args):
+            return None, self.call_error(node, details, context)
+        value, details = method(*args)
+        if details: return None, self.call_error(node, details, context)
+        return value, None
     
-    def no_visit_method(self, context):
+    def no_visit_method(self, *args):
         raise Exception(f'No execute_{self.name} method defined')
     
-    def copy(self):
-        copy = BuiltInFunction(self.name)
-        copy.set_context(self.context)
-        copy.set_pos(self.start, self.end)
-        return copy
-    
     def __repr__(self):
         return f'<built-in function {self.name}>'
-    
-    def execute_rgb(self, context):
-        r = context.symbol_table.get('r').value
-        g = context.symbol_table.get('g').value
-        b = context.symbol_table.get('b').value
 
+    def to_python(self):
+        method = getattr(self, f'execute_{self.name}', self.no_visit_method)
+        def function(*args):
+            value, details = method(*[wrap(arg) for arg in args])
+            if details: raise TypeError(details)
+            return value.to_python()
+        function.__name__ = self.name
+        return function
+    
+    def execute_rgb(self, r, g, b):
+        r, g, b = [getattr(c, 'value', None) for c in [r, g, b]]
         if not all([isinstance(c, int) for c in [r, g, b]]):
-            return RTResult().failure(RTError(
-                self.start, self.end,
-                "Arguments must be integers",
-                context
-            ))
-        return RTResult().success(
-            String(f'#{r:02X}{g:02X}{b:02X}')
-        )
+            return None, 'Arguments must be integers'
+        return String(f'#{r:02X}{g:02X}{b:02X}'), None
 
     execute_rgb.arg_names = ['r', 'g', 'b']
 
 
 class String(Value):
+    __slots__ = ('value', )
+
     def __init__(self, value):
-        super().__init__()
         self.value = value
     
     def plus(self, other):
         if isinstance(other, String):
-            return String(self.value + other.value).set_context(self.context), None
-        return None, self.illegal_operation(other)
+            return String(self.value + other.value), None
+        return None, ILLEGAL_OPERATION
     
     def mul(self, other):
-        if isinstance(other, Number):
-            return String(self.value * other.value).set_context(self.context), None
-        return None, self.illegal_operation(other)
-
-    def copy(self):
-        copy = String(self.value)
-        copy.set_context(self.context)
-        copy.set_pos(self.start, self.end)
-        return copy
+        if isinstance(other, Number) and isinstance(other.value, int):
+            return String(self.value * other.value), None
+        return None, ILLEGAL_OPERATION
     
     def __repr__(self):
         return f'"{self.value}"'
@@ -1189,29 +1201,20 @@ class String(Value):
 
 
 class List(Value):
+    __slots__ = ('elements', )
+
     def __init__(self, elements):
-        super().__init__()
         self.elements = elements
     
     def plus(self, other):
         if isinstance(other, List):
-            new_list = self.copy()
-            new_list.elements.extend(other.elements)
-            return new_list, None
-        return None, self.illegal_operation(other)
+            return List(self.elements + other.elements), None
+        return None, ILLEGAL_OPERATION
 
     def mul(self, other):
-        if isinstance(other, Number):
-            new_list = self.copy()
-            new_list.elements *= other.value
-            return new_list, None
-        return None, self.illegal_operation(other)
-
-    def copy(self):
-        copy = List(self.elements)
-        copy.set_pos(self.start, self.end)
-        copy.set_context(self.context)
-        return copy
+        if isinstance(other, Number) and isinstance(other.value, int):
+            return List(self.elements * other.value), None
+        return None, ILLEGAL_OPERATION
 
     def __repr__(self):
         return f'{self.elements}'
@@ -1221,17 +1224,12 @@ class List(Value):
 
 
 class Dict(Value):
+    __slots__ = ('keys', 'values')
+
     def __init__(self, keys, values):
-        super().__init__()
         self.keys = keys
         self.values = values
     
-    def copy(self):
-        copy = Dict(self.keys, self.values)
-        copy.set_pos(self.start, self.end)
-        copy.set_context(self.context)
-        return copy
-    
     def __repr__(self):
         return '{' + ', '.join([f'{key}:{value}' for key, value in zip(self.keys, self.values)]) + '}'
 
@@ -1240,29 +1238,11 @@ class Dict(Value):
 
 
 class Variable(Value):
+    __slots__ = ('value', )
+
     def __init__(self, value):
-        super().__init__()
         self.value = value
     
-    def get_method(self, method):
-        try:
-            return Variable(getattr(self.value, method))
-        except AttributeError:
-            return None
-
-    def get_attribute(self, attribute):
-        if self.value is None: return None
-        try:
-            Variable(self.value[attribute])
-        except TclError:
-            return None
-
-    def copy(self):
-        copy = Variable(self.value)
-        copy.set_pos(self.start, self.end)
-        copy.set_context(self.context)
-        return copy
-    
     def __repr__(self):
         return str(self.value)
 
@@ -1274,26 +1254,39 @@ class Variable(Value):
 #######################################
 
 class Context:
-    def __init__(self, name, parent=None, parent_pos=None):
+    __slots__ = ('name', 'parent', 'parent_pos', 'symbol_table')
+
+    def __init__(self, name, parent=None, parent_pos=None, symbol_table=None):
         self.name = name
         self.parent = parent
         self.parent_pos = parent_pos
-        self.symbol_table = SymbolTable()
+        self.symbol_table = symbol_table if symbol_table is not None else SymbolTable()
 
 #######################################
 # SYMBOL TABLE
 #######################################
 
 class SymbolTable:
-    def __init__(self, parent=None):
-        self.symbols = {}
+    """Symbols of a context, names not found are looked up in `namespace`,
+    a mapping of python objects (wrapped by `wrap`), and then in the
+    parent table.
+    """
+    __slots__ = ('symbols', 'parent', 'namespace')
+
+    def __init__(self, parent=None, symbols=None, namespace=None):
+        self.symbols = symbols if symbols is not None else {}
         self.parent = parent
+        self.namespace = namespace
     
     def get(self, name):
         value = self.symbols.get(name, None)
-        if value is None and self.parent:
-            return self.parent.symbols.get(name, None)
-        return value
+        if value is not None:
+            return value
+        if self.namespace is not None and name in self.namespace:
+            return wrap(self.namespace[name])
+        if self.parent:
+            return self.parent.get(name)
+        return None
     
     def set(self, name, value):
         self.symbols[name] = value
@@ -1306,6 +1299,9 @@ class SymbolTable:
 #######################################
 
 class Interpreter:
+    """Walks the AST, every visit returns the value and the error. Values are
+    shared as they are, positions for errors come from the visited nodes.
+    """
     def visit(self, node, context):
         method_name = f'visit_{type(node).__name__}'
         method = getattr(self, method_name, self.no_visit_method)
@@ -1315,178 +1311,240 @@ class Interpreter:
         raise Exception(f'No  visit_{type(node).__name__} method defined')
     
     def visit_VarAccessNode(self, node, context):
-        res = RTResult()
         var_name = node.name.value
         value = context.symbol_table.get(var_name)
 
-        if not value:
-            return res.failure(RTError(
+        if value is None:
+            return None, RTError(
                 node.start, node.end,
                 f"'{var_name}' is not defined",
                 context
-            ))
-        
-        value = value.copy().set_pos(node.start, node.end).set_context(context)
-        return res.success(value)
+            )
+        return value, None
     
     def visit_NumberNode(self, node, context):
-        return RTResult().success(
-            Number(node.token.value).set_context(context).set_pos(node.start, node.end)
-        )
+        return Number(node.token.value), None
     
     def visit_StringNode(self, node, context):
-        return RTResult().success(
-            String(node.token.value).set_context(context).set_pos(node.start, node.end)
-        )
+        return String(node.token.value), None
 
     def visit_BinOpNode(self, node, context):
-        res = RTResult()
-        left = res.register(self.visit(node.left_node, context))
-        if res.error: return res
-        right = res.register(self.visit(node.right_node, context))
-        if res.error: return res
+        left, error = self.visit(node.left_node, context)
+        if error: return None, error
+        right, error = self.visit(node.right_node, context)
+        if error: return None, error
 
         if node.op_token.matches('KEYWORD', 'and') or node.op_token.matches('KEYWORD', 'or'):
             func = getattr(left, f'{node.op_token.value.lower()}ed')
         else:
             func = getattr(left, node.op_token.type.lower())
             
-        result, error = func(right)
-        if error: return res.failure(error)
-
-        return res.success(result.set_context(context).set_pos(node.start, node.end))
+        result, details = func(right)
+        if details: return None, RTError(node.start, node.end, details, context)
+        return result, None
     
     def visit_UnaryOpNode(self, node, context):
-        res = RTResult()
-        number = res.register(self.visit(node.node, context))
-        if res.error: return res
+        number, error = self.visit(node.node, context)
+        if error: return None, error
         if node.op_token.type == 'MINUS':
-            number, error = number.mul(Number(-1))
+            number, details = number.mul(Number(-1))
         elif node.op_token.matches('KEYWORD', 'not'):
-            number, error = number.notted()
-        if error:
-            return res.failure(error)
-        return res.success(
-            number.set_context(context).set_pos(node.start, node.end)
-        )
+            number, details = number.notted()
+        else:
+            details = None
+        if details:
+            return None, RTError(node.start, node.end, details, context)
+        return number, None
     
     def visit_FuncDefNode(self, node, context):
-        res = RTResult()
         func_name = node.name.value if node.name else None
-        body = node.body
         arg_names = [arg_name.value for arg_name in node.args]
-        func_value = Function(func_name, body, arg_names).set_context(context).set_pos(node.start, node.end)
+        func_value = Function(func_name, node.body, arg_names, context)
         
         if node.name:
             context.symbol_table.set(func_name, func_value)
         
-        return res.success(func_value)
+        return func_value, None
     
     def visit_CallNode(self, node, context):
-        res = RTResult()
-        args = []
-        value = res.register(self.visit(node.node, context))
-        if res.error: return res
-        value = value.copy().set_context(context).set_pos(node.start, node.end)
+        value, error = self.visit(node.node, context)
+        if error: return None, error
 
+        args = []
         for arg_node in node.args:
-            args.append(res.register(self.visit(arg_node, context)))
-            if res.error: return res
-        
-        return_value = res.register(value.execute(args))
-        if res.error: return res
-        return_value = return_value.copy().set_pos(node.start, node.end).set_context(context)
-        return res.success(return_value)
+            arg, error = self.visit(arg_node, context)
+            if error: return None, error
+            args.append(arg)
+
+        if isinstance(value, BaseFunction):
+            return value.execute(args, context, node)
+
+        # python functions of the scope, their errors are reported as the
+        # compiled expressions do.
+        try:
+            result = value.to_python()(*[arg.to_python() for arg in args])
+        except CallbackError as exception:
+            return None, exception.error
+        except ZeroDivisionError:
+            return None, RTError(node.start, node.end, 'Division by Zero', context)
+        except Exception as exception:
+            return None, RTError(node.start, node.end, str(exception), context)
+        return wrap(result), None
 
     def visit_ListNode(self, node, context):
-        res = RTResult()
         elements = []
         for element in node.elements:
-            elements.append(res.register(self.visit(element, context)))
-            if res.error: return res
-        
-        return res.success(
-            List(elements).set_context(context).set_pos(node.start, node.end)
-        )
+            value, error = self.visit(element, context)
+            if error: return None, error
+            elements.append(value)
+        return List(elements), None
     
     def visit_DictNode(self, node, context):
-        res = RTResult()
         keys = []
         values = []
-        for key, value in zip(node.keys, node.values):
-            keys.append(res.register(self.visit(key, context)))
-            if res.error: return res
-            values.append(res.register(self.visit(value, context)))
-            if res.error: return res
-        
-        return res.success(
-            Dict(keys, values).set_context(context).set_pos(node.start, node.end)
-        )
+        for key_node, value_node in zip(node.keys, node.values):
+            key, error = self.visit(key_node, context)
+            if error: return None, error
+            value, error = self.visit(value_node, context)
+            if error: return None, error
+            keys.append(key)
+            values.append(value)
+        return Dict(keys, values), None
 
     def visit_MethodAccessNode(self, node, context):
-        res = RTResult()
-
         var_name = node.name.value
         result = context.symbol_table.get(var_name)
 
-        if not result:
-            return res.failure(RTError(
+        if result is None:
+            return None, RTError(
                 node.start, node.end,
                 f"'{var_name}' is not defined",
                 context
-            ))
+            )
         
-        methods = node.methods
-        for method in methods:
+        for method in node.methods:
             if value := result.get_method(method.value):
                 result = value
                 var_name += f'.{method.value}'
             else:
-                return res.failure(RTError(
+                return None, RTError(
                     method.start, method.end,
                     f"'{var_name}' has no method '{method.value}'",
                     context
-                ))
+                )
 
         if node.attribute:
             try:
-                result = Variable(result.value[node.attribute.value])
-            except TclError:
-                return res.failure(RTError(
+                result = wrap(result.to_python()[node.attribute.value])
+            except Exception:
+                return None, RTError(
                     node.attribute.start, node.attribute.end,
                     f"'{var_name}' has no attribute '{node.attribute.value}'",
                     context
-                ))
+                )
             
-        return res.success(result.copy().set_context(context).set_pos(node.start, node.end))
+        return result, None
 
 
+interpreter = Interpreter()
+
 global_symbol_table = SymbolTable()
-global_symbol_table.set('True', Number(1))
-global_symbol_table.set('False', Number(0))
+global_symbol_table.set('True', TRUE)
+global_symbol_table.set('False', FALSE)
 global_symbol_table.set('None', Variable(None))
 global_symbol_table.set('rgb', BuiltInFunction('rgb'))
 
-def run(filename, text, args={}):
+#######################################
+# AST CACHE
+#######################################
+
+class ASTCache:
+    """Most recent parsed values by filename and text, `compiled` keeps the
+    compiled `Expression` of the entries that were compiled, it leaves the
+    cache with its entry.
+    """
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.compiled = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry
+
+    def put(self, key, entry):
+        if self.maxsize <= 0: return
+        self.entries[key] = entry
+        if len(self.entries) > self.maxsize:
+            self.compiled.pop(self.entries.popitem(last=False)[0], None)
+
+    def get_compiled(self, key):
+        expression = self.compiled.get(key)
+        if expression is None: return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return expression
+
+    def put_compiled(self, key, expression):
+        if key in self.entries: self.compiled[key] = expression
+
+    def resize(self, maxsize):
+        self.maxsize = maxsize
+        while len(self.entries) > max(maxsize, 0):
+            self.compiled.pop(self.entries.popitem(last=False)[0], None)
+
+    def clear(self):
+        self.entries.clear()
+        self.compiled.clear()
+        self.hits = self.misses = 0
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def __repr__(self):
+        return f'<ASTCache size={len(self.entries)}/{self.maxsize} hits={self.hits} misses={self.misses}>'
+
+
+ast_cache = ASTCache()
+
+def parse(filename, text):
+    key = (filename, text)
+    if entry := ast_cache.get(key):
+        return entry
+    entry = parse_text(filename, text)
+    ast_cache.put(key, entry)
+    return entry
+
+def parse_text(filename, text):
     lexer = Lexer(filename, text)
     tokens, error = lexer.make_tokens()
     if error: return None, error
 
-    if len(tokens) == 1: return '', None
+    if len(tokens) == 1: return None, None
 
     parser = Parser(tokens)
     ast = parser.parse()
     if ast.error: return None, ast.error
+    return ast.node, None
 
-    interpreter = Interpreter()
-    context = Context('<program>')
-
-    for key, value in args.items():
-        global_symbol_table.set(key, Variable(value))
-
-    context.symbol_table = global_symbol_table
-
-    result = interpreter.visit(ast.node, context)
-
-    return result.value, result.error
+def evaluate(node, scope={}):
+    """Evaluates the node, names are looked up in `scope` (any mapping) before
+    the builtins, the global symbol table is never modified.
+    """
+    symbol_table = SymbolTable(global_symbol_table, namespace=scope)
+    return interpreter.visit(node, Context('<program>', symbol_table=symbol_table))
 
+def run(filename, text, args={}):
+    node, error = parse(filename, text)
+    if error: return None, error
+    if node is None: return '', None
+    return evaluate(node, args)
@@ -0,0 +1,101 @@
+from tksystem.compiler import compile_source
+from tksystem.parser import InvalidSyntaxError, Position, Source
+
+
+class Property:
+    """A single `key: value` line of a widget, `expression` is the compiled
+    value and stays None when the value is empty.
+    """
+    def __init__(self, key, source, expression, line):
+        self.key = key
+        self.source = source
+        self.expression = expression
+        self.line = line
+
+    def __repr__(self):
+        return f'<Property {self.key}: {self.source}>'
+
+
+class WidgetRecord:
+    """A widget declaration of a .tk file, `indent` is the indentation level
+    used to find its parent.
+    """
+    def __init__(self, name, indent, line, properties=None):
+        self.name = name
+        self.indent = indent
+        self.line = line
+        self.properties = properties if properties is not None else []
+
+    def __repr__(self):
+        return f'<WidgetRecord {self.name} line {self.line}>'
+
+
+class Program:
+    """Compiled form of a .tk file, what the loader and the cache work with.
+    `names` are all the names its expressions reference.
+    """
+    def __init__(self, filename, records, names=()):
+        self.filename = filename
+        self.records = records
+        self.names = frozenset(names)
+
+    def __repr__(self):
+        return f'<Program {self.filename!a} ({len(self.records)} widgets)>'
+
+
+def iter_widgets(lines):
+    """Reads the lines of a .tk file one at a time and yields a `WidgetRecord`
+    for each widget with its properties (not parsed yet). Line numbers start
+    at 1 and count the blank lines. Properties found before any widget are
+    yielded inside a record without name.
+    """
+    record = None
+    for number, line in enumerate(lines, 1):
+        line = line.rstrip('\r\n')
+        content = line.strip()
+        if not content: continue
+        if ':' in content:
+            if record is None:
+                record = WidgetRecord(None, 0, number)
+            key, source = content.split(':', maxsplit=1)
+            record.properties.append(Property(key.strip(), source.strip(), None, number))
+            continue
+        if record is not None:
+            yield record
+        record = WidgetRecord(content, len(line) - len(line.lstrip('\t')), number)
+    if record is not None:
+        yield record
+
+
+def orphan_error(record):
+    line = f'{record.properties[0].key}: {record.properties[0].source}'
+    source = Source('<TkSystem>', line)
+    return InvalidSyntaxError(
+        Position(0, source), Position(len(line), source),
+        'Expected widget before property'
+    )
+
+
+def compile_lines(filename, lines, expressions=None):
+    """Turns the lines of a .tk file into a `Program`, parsing and compiling
+    every property value once. `expressions` maps sources already compiled
+    (the ones of a program being replaced) to their expression, they are
+    reused as they are. Returns the program and the first error found with
+    its line.
+    """
+    if expressions is None: expressions = {}
+    records = []
+    names = set()
+    for record in iter_widgets(lines):
+        if record.name is None:
+            return None, (orphan_error(record), record.line)
+        for prop in record.properties:
+            expression = expressions.get(prop.source)
+            if expression is None:
+                expression, error = compile_source('<TkSystem>', prop.source)
+                if error: return None, (error, prop.line)
+            if expression is None: continue
+            prop.expression = expression
+            names.update(expression.names)
+        records.append(record)
+    return Program(filename, records, names), None
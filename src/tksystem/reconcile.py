@@ -0,0 +1,657 @@
+"""
+Reconciliation of a new widget tree with the widgets of a live window. Every
+window made by `functions.load` keeps a `Reconciler` with the tree it was
+built from, `functions.apply` and the hot reload give it the new tree and
+only the differences reach tk: new widgets are created, missing ones
+destroyed, the options that changed configured with one call per widget and
+widgets that changed of parent moved. Properties whose text didn't change
+are not evaluated at all and options set to the value they already have are
+skipped.
+
+Widgets are matched by id first, anywhere in the tree, and then by position
+between the siblings of the same widget. Tk can't change the parent of a
+widget, a widget is moved by managing it inside its new parent (the `in_`
+option of pack, grid and place), so it can only move to a descendant of the
+parent it was created in, otherwise it is created again.
+
+The children of lazy widgets (`lazy: True`, the pages of notebooks and
+containers) are kept as nodes without widgets until their widget is shown
+for the first time, then the reconciler builds them. A notebook or container
+with `page_cache: n` keeps only its `n` pages shown last built, the children
+of the others are destroyed and built again when the page is shown, with
+the values the user gave them.
+"""
+
+import sys
+from collections import OrderedDict
+from time import perf_counter
+
+from tksystem.backends import GEOMETRY_MANAGERS, configure, evaluate, is_lazy
+
+MISSING = object()
+
+#######################################
+# TREE
+#######################################
+
+class Node:
+    """A widget of the tree with the record it is built from, `values` are
+    the options last set by the reconciler.
+    """
+    __slots__ = ('record', 'widget', 'children', 'sources', 'values')
+
+    def __init__(self, record, widget=None):
+        self.record = record
+        self.widget = widget
+        self.children = []
+        self.sources = {prop.key: prop.source for prop in record.properties}
+        self.values = {}
+
+    @property
+    def id(self):
+        return self.sources.get('id')
+
+    def walk(self):
+        nodes = [self]
+        while nodes:
+            node = nodes.pop()
+            yield node
+            nodes.extend(reversed(node.children))
+
+    def __repr__(self):
+        return f'<Node {self.record.name} line {self.record.line}>'
+
+
+def make_tree(records, widgets=None):
+    """Nodes of the records nested by their indentation, `widgets` are the
+    widgets already built for them in the same order. Returns the root.
+    """
+    root = None
+    parents = []
+    for index, record in enumerate(records):
+        while parents and parents[-1].record.indent >= record.indent:
+            parents.pop()
+        node = Node(record, widgets[index] if widgets is not None else None)
+        if parents: parents[-1].children.append(node)
+        else: root = node
+        parents.append(node)
+    return root
+
+
+def geometry_of(sources):
+    for manager in GEOMETRY_MANAGERS:
+        if f'.{manager}' in sources: return manager
+    return None
+
+
+def option_default(widget, key):
+    """Default value of the option, MISSING if it can't be known."""
+    try:
+        return widget.configure(key)[3]
+    except Exception:
+        return MISSING
+
+
+def can_move(widget, parent):
+    """Tells if the widget can be managed inside `parent`, it must be a
+    descendant of the master of the widget.
+    """
+    master = getattr(widget, 'master', None)
+    while parent is not None:
+        if parent is widget: return False
+        if parent is master: return True
+        parent = getattr(parent, 'master', None)
+    return False
+
+
+def is_option(key):
+    return key not in ('id', 'execute', 'lazy', 'page_cache') and not key.startswith('.')
+
+
+class TreeChanges:
+    """What the reconciliation did to the live widgets."""
+    def __init__(self):
+        self.created = 0
+        self.destroyed = 0
+        self.moved = 0
+        self.configured = 0
+        self.placed = 0
+        self.called = 0
+        self.swapped = 0
+        self.time = 0.0
+
+    def __repr__(self):
+        return (
+            f'<TreeChanges created={self.created} destroyed={self.destroyed} '
+            f'moved={self.moved} configured={self.configured} placed={self.placed} '
+            f'called={self.called} swapped={self.swapped} time={self.time * 1000:.1f}ms>'
+        )
+
+#######################################
+# PAGE CACHE
+#######################################
+
+# options that hold the name of a tcl variable.
+VARIABLE_OPTIONS = ('variable', 'textvariable', 'listvariable')
+# tk classes of the widgets with a text the user writes.
+TEXT_ENTRIES = ('Entry', 'TEntry', 'Spinbox', 'TSpinbox', 'TCombobox')
+
+
+def widget_state(widget):
+    """Values of the widget the user can change and its options don't keep:
+    its variables, text, selection and value.
+    """
+    state = {}
+    for key in VARIABLE_OPTIONS:
+        try:
+            name = str(widget.cget(key))
+        except Exception:
+            continue
+        if name: state[key] = widget.getvar(name)
+    kind = widget.winfo_class()
+    if kind in TEXT_ENTRIES: state['text'] = widget.get()
+    elif kind == 'Text': state['text'] = widget.get('1.0', 'end-1c')
+    elif kind == 'Listbox': state['selection'] = widget.curselection()
+    elif kind in ('Scale', 'TScale'): state['value'] = widget.get()
+    elif kind == 'TNotebook' and widget.tabs(): state['tab'] = widget.index('current')
+    return state
+
+
+def restore_state(widget, state):
+    for key in VARIABLE_OPTIONS:
+        if key in state: widget.setvar(str(widget.cget(key)), state[key])
+    kind = widget.winfo_class()
+    if 'text' in state:
+        start = '1.0' if kind == 'Text' else 0
+        widget.delete(start, 'end')
+        widget.insert(start, state['text'])
+    for index in state.get('selection', ()): widget.selection_set(index)
+    if 'value' in state: widget.set(state['value'])
+    if 'tab' in state: widget.select(state['tab'])
+
+
+class PageCache:
+    """Pages of a notebook or container kept built, the `size` shown last.
+    `hits` counts the pages shown that were built, `misses` the ones that
+    had to be built and `rebuilds` and `rebuild_time` the misses of pages
+    that were evicted before.
+    """
+    def __init__(self, size):
+        self.size = max(int(size), 1)
+        self.recent = OrderedDict()
+        self.snapshots = {}
+        self.hits = 0
+        self.misses = 0
+        self.rebuilds = 0
+        self.evictions = 0
+        self.rebuild_time = 0.0
+
+    def as_dict(self):
+        return {
+            'size': self.size,
+            'built': len(self.recent),
+            'hits': self.hits,
+            'misses': self.misses,
+            'rebuilds': self.rebuilds,
+            'evictions': self.evictions,
+            'rebuild_time': self.rebuild_time
+        }
+
+    def __repr__(self):
+        return (
+            f'<PageCache size={self.size} built={len(self.recent)} hits={self.hits} '
+            f'misses={self.misses} rebuilds={self.rebuilds} evictions={self.evictions} '
+            f'rebuild_time={self.rebuild_time * 1000:.1f}ms>'
+        )
+
+#######################################
+# RECONCILER
+#######################################
+
+class Reconciler:
+    """Live tree of a window and what is needed to evaluate its properties
+    again, the scope of the load, its backend and the registry and module it
+    resolved names with. `pending` has the nodes of the lazy widgets whose
+    children were not built yet by widget, `caches` the `PageCache` of the
+    notebooks and containers with `page_cache` and `pages` the nodes of
+    their pages built.
+    """
+    def __init__(self, root, scope, backend, interpret, registry=None, module=None, widget_classes=None):
+        self.root = root
+        self.scope = scope
+        self.backend = backend
+        self.interpret = interpret
+        self.registry = registry
+        self.module = module
+        self.widget_classes = {} if widget_classes is None else widget_classes
+        self.changed_names = frozenset()
+        self.swapped_names = frozenset()
+        self.pending = {}
+        self.caches = {}
+        self.pages = {}
+        self._kept = set()
+        self._new_ids = set()
+        self._old = ({}, {}, {})
+        self._created = None
+
+        nodes = [root]
+        while nodes:
+            node = nodes.pop()
+            if 'page_cache' in node.sources: self.set_cache(node)
+            if node.children and node.children[0].widget is None: self.defer(node)
+            else: nodes.extend(node.children)
+
+    def apply(self, program, widget_classes, module_names, swapped=()):
+        """Applies the compiled program to the live widgets, `module_names`
+        are the names of the module it uses and `swapped` the ones of its
+        functions and classes whose code was swapped in place. Returns the
+        `TreeChanges` and an error.
+        """
+        start = perf_counter()
+        root = make_tree(program.records)
+        if root.record.name != self.root.record.name:
+            return None, 'The main widget changed, the window must be loaded again'
+        old_names = self.scope.maps[2]
+        self.changed_names = frozenset([
+            name for name in module_names.keys() | old_names.keys()
+            if module_names.get(name) is not old_names.get(name)
+        ])
+        self.swapped_names = frozenset(swapped)
+        self.scope.maps[2] = module_names
+        self.widget_classes = widget_classes
+
+        changes = TreeChanges()
+        old_ids = {
+            node.id: node for node in self.root.walk()
+            if node.id is not None and node.widget is not None
+        }
+        self._new_ids = {node.id for node in root.walk() if node.id is not None}
+        self._kept = set()
+        self._old = (self.pending, self.caches, self.pages)
+        self.pending, self.caches, self.pages = {}, {}, {}
+        self._created = []
+        failed = True
+        try:
+            error = self.update(self.root, root, widget_classes, changes, old_ids)
+            if not error:
+                self.remove(self.root, changes)
+                failed = False
+        finally:
+            if failed:
+                self.discard()
+                self.pending, self.caches, self.pages = self._old
+            self._kept = set()
+            self._old = ({}, {}, {})
+            self._created = None
+        if error: return None, error
+        for cache in self.caches.values():
+            for widget in [widget for widget in cache.recent if widget not in self.pages]:
+                del cache.recent[widget]
+            for widget in [widget for widget in cache.snapshots if widget not in self.pending]:
+                del cache.snapshots[widget]
+            self.trim(cache)
+        self.root = root
+        self.update_ids()
+        changes.time = perf_counter() - start
+        return changes, None
+
+    def match(self, old, new, old_ids):
+        """Pairs every child of the new node with the old node it updates or
+        None, by id in the whole tree and then by position among the old
+        children. Old nodes whose id is still in the new tree are only
+        matched by it.
+        """
+        siblings = old.children
+        sibling_ids = {id(child) for child in siblings}
+        pairs = {}
+        for child in new.children:
+            if child.id is None: continue
+            candidate = old_ids.get(child.id)
+            if (
+                candidate is None or id(candidate) in self._kept
+                or candidate.record.name != child.record.name
+            ):
+                continue
+            if id(candidate) in sibling_ids or can_move(candidate.widget, new.widget):
+                pairs[id(child)] = candidate
+                self._kept.add(id(candidate))
+
+        left = {}
+        for child in siblings:
+            if id(child) in self._kept: continue
+            if child.id is not None and child.id in self._new_ids: continue
+            left.setdefault(child.record.name, []).append(child)
+        for child in new.children:
+            if id(child) in pairs: continue
+            candidates = left.get(child.record.name)
+            if candidates:
+                pairs[id(child)] = candidates.pop(0)
+                self._kept.add(id(pairs[id(child)]))
+            else:
+                pairs[id(child)] = None
+        matched = []
+        for child in new.children:
+            pair = pairs[id(child)]
+            matched.append((child, pair, pair is not None and id(pair) not in sibling_ids))
+        return matched
+
+    def update(self, old, new, widget_classes, changes, old_ids, move_to=None, parent_class=None):
+        self._kept.add(id(old))
+        widget = new.widget = old.widget
+        new.values = old.values
+        old_pending, old_caches, old_pages = self._old
+        if widget in old_caches: self.caches[widget] = old_caches[widget]
+        if widget in old_pages: self.pages[widget] = new
+        self.scope.maps[0]['self'] = widget
+        error = self.update_properties(old, new, changes, move_to)
+        if error: return error
+
+        widget_class = widget_classes[new.record.name]
+        if widget in old_pending:
+            # the children were never built, the new ones wait in their place.
+            lazy, error = is_lazy(new.record, parent_class, self.scope, self.interpret)
+            if error: return error
+            if lazy and new.children:
+                self.pending[widget] = new
+                return None
+            for child in new.children:
+                error = self.build(child, widget, widget_classes, changes, widget_class)
+                if error: return error
+            return None
+
+        pairs = self.match(old, new, old_ids)
+        for index, (child, pair, moved) in enumerate(pairs):
+            if pair is None:
+                error = self.build(child, widget, widget_classes, changes, widget_class)
+                if error: return error
+                self.place_before(child, pairs[index + 1:])
+                continue
+            error = self.update(
+                pair, child, widget_classes, changes, old_ids,
+                widget if moved else None, widget_class
+            )
+            if error: return error
+            if moved:
+                changes.moved += 1
+                self.place_before(child, pairs[index + 1:])
+        return None
+
+    def build(self, node, parent, widget_classes, changes, parent_class=None):
+        """Creates the widgets of a new node, every one under its parent. The
+        children of lazy widgets are deferred.
+        """
+        stack = [(node, parent, parent_class)]
+        while stack:
+            child, parent, parent_class = stack.pop()
+            widget_class = widget_classes[child.record.name]
+            widget, error = self.backend.build_record(
+                child.record, parent, widget_class, self.scope, self.interpret
+            )
+            if error: return error
+            child.widget = widget
+            if child is node and self._created is not None: self._created.append(widget)
+            changes.created += 1
+            if 'page_cache' in child.sources:
+                error = self.set_cache(child)
+                if error: return error
+            if not child.children: continue
+            lazy, error = is_lazy(child.record, parent_class, self.scope, self.interpret)
+            if error: return error
+            if lazy:
+                self.defer(child)
+                continue
+            stack.extend([(grandchild, widget, widget_class) for grandchild in reversed(child.children)])
+        return None
+
+    def discard(self):
+        """Destroys the widgets created by an `apply` that failed, the live
+        tree is still the old one and would never destroy them. The options
+        already set on the kept widgets stay.
+        """
+        for widget in reversed(self._created):
+            widget.destroy()
+        self.update_ids()
+
+    def defer(self, node):
+        """Leaves the children of the node to be built the first time its
+        widget is shown.
+        """
+        widget = node.widget
+        self.pending[widget] = node
+        self.backend.when_shown(widget, lambda: self.shown(widget))
+
+    def shown(self, widget):
+        cache = self.caches.get(getattr(widget, 'master', None))
+        if cache is None: changes, error = self.expand(widget)
+        else: changes, error = self.show_page(cache, widget)
+        if error: print(error, file=sys.stderr)
+
+    def set_cache(self, node):
+        """Creates or resizes the page cache of the node by its `page_cache`,
+        `apply` evicts the pages left out once the tree is updated.
+        """
+        prop = next(prop for prop in node.record.properties if prop.key == 'page_cache')
+        self.scope.maps[0]['self'] = node.widget
+        size, error = evaluate(prop, self.scope, self.interpret)
+        if error: return error
+        cache = self.caches.get(node.widget)
+        if cache is None: self.caches[node.widget] = PageCache(size)
+        else: cache.size = max(int(size), 1)
+        return None
+
+    def show_page(self, cache, widget):
+        """Builds the page if it was not built and marks it as shown last, the
+        pages that don't fit in the cache anymore are evicted.
+        """
+        node = self.pending.get(widget)
+        changes = None
+        if node is not None:
+            cache.misses += 1
+            snapshot = cache.snapshots.pop(widget, None)
+            start = perf_counter()
+            changes, error = self.expand(widget)
+            if error: return None, error
+            if snapshot is not None:
+                for child, (name, state) in zip(list(node.walk())[1:], snapshot):
+                    if state and child.widget is not None and child.record.name == name:
+                        try:
+                            restore_state(child.widget, state)
+                        except Exception:
+                            pass
+                cache.rebuilds += 1
+                cache.rebuild_time += perf_counter() - start
+        elif widget in self.pages: cache.hits += 1
+        else: return None, None
+        cache.recent[widget] = None
+        cache.recent.move_to_end(widget)
+        self.trim(cache)
+        return changes, None
+
+    def trim(self, cache):
+        while len(cache.recent) > cache.size:
+            widget = next(iter(cache.recent))
+            del cache.recent[widget]
+            self.evict(cache, widget)
+
+    def evict(self, cache, widget):
+        """Destroys the children of the page and keeps its nodes to build them
+        again, with the state of their widgets.
+        """
+        node = self.pages.pop(widget, None)
+        if node is None: return
+        snapshot = []
+        destroyed = set()
+        for child in list(node.walk())[1:]:
+            state = None
+            if child.widget is not None:
+                try:
+                    state = widget_state(child.widget)
+                except Exception:
+                    pass
+                destroyed.add(child.widget)
+                self.pending.pop(child.widget, None)
+                self.caches.pop(child.widget, None)
+                self.pages.pop(child.widget, None)
+            snapshot.append((child.record.name, state))
+        for child in node.children:
+            if child.widget is not None: child.widget.destroy()
+        for child in list(node.walk())[1:]:
+            child.widget = None
+            child.values = {}
+        ids = self.scope.maps[1]
+        for key in [key for key, value in ids.items() if value in destroyed]:
+            del ids[key]
+        cache.snapshots[widget] = snapshot
+        cache.evictions += 1
+        self.pending[widget] = node
+
+    def expand(self, widget):
+        """Builds the children left of the lazy widget, returns the
+        `TreeChanges` and an error. Nothing is done if they were built.
+        """
+        node = self.pending.pop(widget, None)
+        if node is None: return None, None
+        start = perf_counter()
+        changes = TreeChanges()
+        widget_class = self.widget_classes[node.record.name]
+        for child in node.children:
+            error = self.build(child, widget, self.widget_classes, changes, widget_class)
+            if error: return None, error
+        if getattr(widget, 'master', None) in self.caches: self.pages[widget] = node
+        changes.time = perf_counter() - start
+        return changes, None
+
+    def expand_all(self):
+        """Builds every lazy subtree, the ones inside them too."""
+        while self.pending:
+            changes, error = self.expand(next(iter(self.pending)))
+            if error: return error
+        return None
+
+    def place_before(self, node, following):
+        """Packs the new or moved widget before the next sibling that already
+        was there, so it takes its place in the order of the file instead of
+        the end.
+        """
+        if geometry_of(node.sources) != 'pack': return
+        for child, pair, moved in following:
+            if pair is None or moved or geometry_of(child.sources) != 'pack': continue
+            node.widget.pack_configure(before=pair.widget)
+            return
+
+    def uses_changed_names(self, prop):
+        expression = prop.expression
+        if expression is None: return False
+        if not self.changed_names.isdisjoint(expression.names): return True
+        # functions swapped in place are the same objects, only the values
+        # that come from calling them change, callbacks already run the new code.
+        return expression.calls and not self.swapped_names.isdisjoint(expression.names)
+
+    def update_properties(self, old, new, changes, move_to=None):
+        """Evaluates the properties whose text changed (or that use names of
+        the module that changed), the options are configured at once.
+        """
+        widget = new.widget
+        old_manager = geometry_of(old.sources)
+        new_manager = geometry_of(new.sources)
+        if old_manager is not None and old_manager != new_manager:
+            getattr(widget, f'{old_manager}_forget')()
+            changes.placed += 1
+
+        options = {}
+        for prop in new.record.properties:
+            key = prop.key
+            if key == 'lazy': continue
+            moving = move_to is not None and key[1:] == new_manager
+            # `execute` is only run again when its text changes.
+            if (
+                not moving and old.sources.get(key) == prop.source
+                and (key == 'execute' or not self.uses_changed_names(prop))
+            ):
+                continue
+            if key == 'page_cache':
+                error = self.set_cache(new)
+                if error: return error
+                continue
+            value, error = evaluate(prop, self.scope, self.interpret)
+            if error: return error
+            if is_option(key):
+                if self.known_value(old, new, key) != value: options[key] = value
+                continue
+            if moving and isinstance(value, dict): value = {**value, 'in_': move_to}
+            self.backend.apply(widget, key, value, self.scope)
+            if key[1:] in GEOMETRY_MANAGERS: changes.placed += 1
+            elif key != 'id': changes.called += 1
+        # a moved widget was created before its new parent and would be under it.
+        if move_to is not None and new_manager is not None: widget.lift()
+
+        for key in old.sources.keys() - new.sources.keys():
+            if key == 'page_cache': self.caches.pop(widget, None)
+            if not is_option(key): continue
+            new.values.pop(key, None)
+            default = option_default(widget, key)
+            if default is not MISSING: options[key] = default
+        if options:
+            configure(widget, options, self.widget_classes.get(new.record.name))
+            new.values.update(options)
+            changes.configured += len(options)
+        return None
+
+    def known_value(self, old, new, key):
+        """Value the option has, the one set by the reconciler or else the
+        value of the old text of the property, MISSING if not known.
+        """
+        value = new.values.get(key, MISSING)
+        if value is not MISSING or old.sources.get(key, new.sources[key]) == new.sources[key]:
+            return value
+        prop = next(prop for prop in old.record.properties if prop.key == key)
+        value, error = evaluate(prop, self.scope, self.interpret)
+        return MISSING if error else value
+
+    def remove(self, node, changes):
+        """Destroys the old widgets that were not kept. A widget that has a
+        kept descendant (moved somewhere else) is only hidden, destroying it
+        would destroy them.
+        """
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if node.widget is None: continue
+            if id(node) in self._kept:
+                stack.extend(node.children)
+                continue
+            if any([id(child) in self._kept for child in node.walk()]):
+                manager = geometry_of(node.sources)
+                if manager is not None: getattr(node.widget, f'{manager}_forget')()
+                stack.extend(node.children)
+                continue
+            node.widget.destroy()
+            changes.destroyed += 1
+
+    def update_ids(self):
+        """Ids of the widgets of the new tree, the ones of destroyed widgets or
+        removed from the file are dropped.
+        """
+        ids = self.scope.maps[1]
+        ids.clear()
+        for node in self.root.walk():
+            if node.id is None or node.widget is None: continue
+            prop = next(prop for prop in node.record.properties if prop.key == 'id')
+            self.scope.maps[0]['self'] = node.widget
+            value, error = evaluate(prop, self.scope, self.interpret)
+            if error is None: ids[value] = node.widget
+
+
+# attribute of the main widget that keeps its reconciler.
+ATTRIBUTE = '_tksystem_reconciler'
+
+
+def attach(window, reconciler):
+    try:
+        setattr(window, ATTRIBUTE, reconciler)
+    except AttributeError:
+        pass
+
+
+def reconciler_of(window):
+    return getattr(window, ATTRIBUTE, None)
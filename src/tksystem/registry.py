@@ -0,0 +1,100 @@
+"""
+Registry of the widget classes a .tk file can use. Packages are looked up in
+order and each one is imported only when a name was not found in the ones
+before it, so a file of tkinter widgets never imports the packages it doesn't
+use. Every package has a namespace to pick a class explicitly, `ttk.Button`
+instead of `Button`, which only imports that package. Names found are kept so
+finding the class of a widget line again is one lookup. Packages that can't
+be imported are skipped.
+"""
+
+import importlib
+
+
+class WidgetRegistry:
+    """Maps widget names to classes, earlier packages win when two of them
+    have the same name. One registry can be shared by any number of loads.
+    """
+    def __init__(self, packages=None):
+        self.packages = []
+        self.widgets = {}
+        self.classes = {}
+        self.names = {}
+        if packages is None: packages = DEFAULT_PACKAGES
+        for namespace, package in packages:
+            self.register(package, namespace, first=False)
+
+    def register(self, package, namespace=None, first=True):
+        """Adds a package (module or module name) of widgets, by default it is
+        searched before the ones already registered.
+        """
+        if namespace is None:
+            namespace = package if isinstance(package, str) else package.__name__
+            namespace = namespace.rpartition('.')[2]
+        entry = (namespace, package)
+        if first: self.packages.insert(0, entry)
+        else: self.packages.append(entry)
+        self.classes = {}
+
+    def add(self, name, widget_class):
+        """Adds a single class, it is found before any package."""
+        self.widgets[name] = widget_class
+        self.classes = {}
+
+    def package_names(self, package):
+        """Names of the package, importing it the first time. Packages that
+        can't be imported have none.
+        """
+        names = self.names.get(package)
+        if names is None:
+            names = {}
+            if isinstance(package, str):
+                try:
+                    names = vars(importlib.import_module(package))
+                except ImportError:
+                    pass
+            else:
+                names = vars(package)
+            self.names[package] = names
+        return names
+
+    def lookup(self, name):
+        """Class of the name or None, packages are imported one at a time
+        until one has it.
+        """
+        if widget := self.widgets.get(name): return widget
+        if widget := self.classes.get(name): return widget
+        for namespace, package in self.packages:
+            if name.startswith(f'{namespace}.'):
+                widget = self.package_names(package).get(name[len(namespace) + 1:])
+            else:
+                widget = self.package_names(package).get(name) if '.' not in name else None
+            if widget:
+                self.classes[name] = widget
+                return widget
+        return None
+
+    def resolve(self, name, module=None):
+        """Returns the class of the given widget name, names defined in the
+        module of the .tk file are found first.
+        """
+        if module is not None and (widget := vars(module).get(name)):
+            return widget
+        if widget := self.lookup(name):
+            return widget
+        raise AttributeError(f'Not widget {name!a} founded.')
+
+    def __contains__(self, name):
+        return self.lookup(name) is not None
+
+    def __repr__(self):
+        return f'<WidgetRegistry {[namespace for namespace, _ in self.packages]}>'
+
+
+DEFAULT_PACKAGES = (
+    ('gui', 'pylejandria.gui'),
+    ('tk', 'tkinter'),
+    ('ttk', 'tkinter.ttk')
+)
+
+registry = WidgetRegistry()
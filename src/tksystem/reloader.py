@@ -1,4 +1,12 @@
 import os, sys, subprocess
+import importlib.util
+import traceback
+from time import perf_counter
+from types import CellType, FunctionType
+
+from tksystem.functions import load, load_program, make_error, reconcile
+from tksystem.reconcile import reconciler_of
+from tksystem.watcher import FileWatcher
 
 
 class Reloader(object):
@@ -19,8 +27,11 @@ class Reloader(object):
         sys.exit(self.RELOADING_CODE)
 
 
-def run_with_reloader(root, *hotkeys):
-    """Run the given application in an independent python interpreter."""
+def run_with_reloader(root, *hotkeys, files=(), interval=0.5, debounce=0.2):
+    """Run the given application in an independent python interpreter. It is
+    started again with the hotkeys or when any of `files` (.tk files, modules
+    of callbacks...) is saved.
+    """
     import signal
     signal.signal(signal.SIGTERM, lambda *args: sys.exit(0))
     reloader = Reloader()
@@ -28,6 +39,11 @@ def run_with_reloader(root, *hotkeys):
         if os.environ.get('TKINTER_MAIN') == 'true':
             for hotkey in hotkeys:
                 root.bind_all(hotkey, lambda event: reloader.trigger_reload())
+            if files:
+                watcher = FileWatcher(root, interval, debounce)
+                for filename in files:
+                    watcher.watch(filename, lambda paths: reloader.trigger_reload())
+                watcher.start()
             root.mainloop()
         else:
             sys.exit(reloader.start_process())
@@ -35,6 +51,248 @@ def run_with_reloader(root, *hotkeys):
         pass
 
 
+#######################################
+# MODULE HOT SWAP
+#######################################
+
+# values of a module that are replaced when it is swapped, any other object
+# is state of the module and the live one is kept.
+IMMUTABLE = (str, bytes, int, float, complex, bool, tuple, frozenset, type(None))
+MISSING = object()
+
+
+def class_closure(function, cls):
+    """Closure of the function whose `__class__` cell, the one zero-argument
+    `super()` uses, holds `cls`.
+    """
+    if function.__closure__ is None: return None
+    return tuple([
+        CellType(cls) if name == '__class__' else cell
+        for name, cell in zip(function.__code__.co_freevars, function.__closure__)
+    ])
+
+
+def rebind(function, namespace, cls=None):
+    """Copy of the function that finds its globals in `namespace`, methods
+    get `cls` as the class of their `super()`.
+    """
+    closure = function.__closure__ if cls is None else class_closure(function, cls)
+    copy = FunctionType(
+        function.__code__, namespace, function.__name__,
+        function.__defaults__, closure
+    )
+    copy.__kwdefaults__ = function.__kwdefaults__
+    copy.__qualname__ = function.__qualname__
+    copy.__doc__ = function.__doc__
+    copy.__dict__.update(function.__dict__)
+    return copy
+
+
+def update_function(old, new):
+    """Gives the code of the new function to the old one, so every command,
+    binding or callable that holds the old one runs the new code. Functions
+    with closures can't be updated, returns False for them, except methods
+    whose only free variable is the `__class__` of `super()`: the cell of
+    the old one already holds the live class.
+    """
+    names = new.__code__.co_freevars
+    if old.__code__.co_freevars != names or any([name != '__class__' for name in names]):
+        return False
+    old.__code__ = new.__code__
+    old.__defaults__ = new.__defaults__
+    old.__kwdefaults__ = new.__kwdefaults__
+    old.__doc__ = new.__doc__
+    old.__dict__.update(new.__dict__)
+    return True
+
+
+def rebind_method(value, namespace, cls):
+    """Copy of the function, or of the ones wrapped by a classmethod,
+    staticmethod or property, bound to the namespace and the class.
+    """
+    if isinstance(value, FunctionType): return rebind(value, namespace, cls)
+    if isinstance(value, (classmethod, staticmethod)) and isinstance(value.__func__, FunctionType):
+        return type(value)(rebind(value.__func__, namespace, cls))
+    if isinstance(value, property):
+        return property(*[
+            rebind(function, namespace, cls) if isinstance(function, FunctionType) else function
+            for function in (value.fget, value.fset, value.fdel)
+        ], value.__doc__)
+    return value
+
+
+def update_class(old, new, namespace):
+    """Moves the attributes of the new class to the old one, the instances
+    alive get the new methods. The methods that can't be updated in place
+    are copied with `super()` pointing at the old class, the one of the
+    instances.
+    """
+    for name, value in vars(new).items():
+        if name in ('__dict__', '__weakref__'): continue
+        current = vars(old).get(name)
+        if isinstance(value, FunctionType) and isinstance(current, FunctionType):
+            if update_function(current, value): continue
+        value = rebind_method(value, namespace, old)
+        try:
+            setattr(old, name, value)
+        except (AttributeError, TypeError):
+            pass
+    for name in vars(old).keys() - vars(new).keys():
+        if isinstance(vars(old)[name], FunctionType): delattr(old, name)
+
+
+def swap_module(module, filename):
+    """Runs the code of the module file again and moves it into the live
+    module like `importlib.reload`, but functions and classes are updated in
+    place and the state of the module (variables, instances, lists...) is
+    kept, so nothing that holds them must be found and changed. The new code
+    runs in a module of its own first, an exception leaves the live module as
+    it was. Returns the names of the functions and classes updated in place,
+    they are the same objects but calling them may give other values.
+    """
+    name = module.__name__ if module.__name__ != '__main__' else '__tksystem_swap__'
+    spec = importlib.util.spec_from_file_location(name, filename)
+    fresh = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(fresh)
+
+    namespace = vars(module)
+    swapped = []
+    for key, value in vars(fresh).items():
+        if key.startswith('__') and key.endswith('__'): continue
+        current = namespace.get(key, MISSING)
+        if isinstance(value, FunctionType) and value.__module__ == name:
+            if isinstance(current, FunctionType) and update_function(current, value):
+                swapped.append(key)
+                continue
+            namespace[key] = rebind(value, namespace)
+        elif isinstance(value, type) and value.__module__ == name:
+            if isinstance(current, type) and current.__name__ == value.__name__:
+                update_class(current, value, namespace)
+                swapped.append(key)
+                continue
+            namespace[key] = value
+        elif current is MISSING or type(current).__qualname__ != type(value).__qualname__:
+            namespace[key] = value
+        elif isinstance(value, IMMUTABLE) and value != current:
+            namespace[key] = value
+    return swapped
+
+#######################################
+# IN-PROCESS HOT RELOAD
+#######################################
+
+class HotReloader:
+    """Reloads a .tk file in the running process. The window is loaded with
+    `functions.load` and the new tree of the file is given to its
+    `Reconciler`, only the differences are applied: new widgets are created,
+    missing ones destroyed, properties whose text changed evaluated again
+    and widgets moved to their new parent. The window and the state of the
+    widgets that are kept stay as they are. When the module of the file
+    changes it is swapped in place with `swap_module`, the callables already
+    given to the widgets run the new code and only the properties that use
+    names that got new objects, or that call functions swapped in place,
+    are evaluated again.
+    """
+    def __init__(self, tk_filename, file=None, interpret=None, registry=None, backend=None):
+        self.tk_filename = tk_filename
+        self.file = file
+        self.interpret = interpret
+        self.registry = registry
+        self.backend = backend
+        self.window = None
+        self.mtime = None
+
+    @property
+    def reconciler(self):
+        return reconciler_of(self.window)
+
+    def load(self):
+        """Builds the window with `functions.load`, returns it and an
+        error.
+        """
+        self.mtime = self.modified()
+        self.window, error = load(
+            self.tk_filename, self.file, self.interpret,
+            registry=self.registry, backend=self.backend
+        )
+        return self.window, error
+
+    def reload(self, module_changed=False):
+        """Applies the changes of the file to the live widgets, returns the
+        `TreeChanges` and an error. When the file has a syntax error the
+        live widgets are not touched. `module_changed` swaps the module of the
+        file, an exception running its new code leaves everything as it was.
+        """
+        start = perf_counter()
+        reconciler = self.reconciler
+        swapped = []
+        if module_changed and reconciler.module is None and self.file is not None:
+            from pylejandria.tools import get_module
+            reconciler.module = get_module(self.file)
+        elif module_changed:
+            try:
+                swapped = swap_module(reconciler.module, self.file)
+            except Exception:
+                return None, traceback.format_exc()
+        self.mtime = self.modified()
+        program, error = load_program(self.tk_filename)
+        if error: return None, make_error(*error)
+        changes, error = reconcile(reconciler, program, swapped)
+        if error: return None, error
+        changes.swapped = len(swapped)
+        changes.time = perf_counter() - start
+        return changes, None
+
+    def modified(self):
+        try:
+            return os.stat(self.tk_filename).st_mtime_ns
+        except OSError:
+            return None
+
+    def check(self, force=False, module_changed=False):
+        """Reloads if the file changed since the last load, errors are
+        printed and the widgets kept.
+        """
+        if not force and not module_changed and self.modified() == self.mtime: return None
+        changes, error = self.reload(module_changed)
+        if error: print(error, file=sys.stderr)
+        return changes
+
+    def files(self):
+        """Files the window depends on, the .tk file and its module."""
+        files = [self.tk_filename]
+        if self.file is not None: files.append(self.file)
+        return [os.path.abspath(filename) for filename in files]
+
+    def changed(self, paths):
+        """Called by the watcher with the files that changed."""
+        module_changed = self.file is not None and os.path.abspath(self.file) in paths
+        return self.check(force=True, module_changed=module_changed)
+
+    def watch(self, interval=0.5, debounce=0.2, use_inotify=True):
+        """Reloads the window when its files change, returns the started
+        `FileWatcher`.
+        """
+        watcher = FileWatcher(self.window, interval, debounce, use_inotify)
+        for filename in self.files():
+            watcher.watch(filename, self.changed)
+        return watcher.start()
+
+
+def run_with_hot_reload(tk_filename, file=None, hotkeys=('<Control-r>', '<Control-R>'), interval=0.5, debounce=0.2):
+    """Loads the .tk file and runs its window, the file is reloaded in the same
+    process when it or its module is saved, or with the hotkeys. `interval`
+    is the seconds between checks when the files must be polled.
+    """
+    reloader = HotReloader(tk_filename, file)
+    window, error = reloader.load()
+    if error: sys.exit(error)
+    for hotkey in hotkeys:
+        window.bind_all(hotkey, lambda event: reloader.check(force=True))
+    reloader.watch(interval, debounce)
+    window.mainloop()
+
+
 if __name__ == "__main__":
     from tkinter import Tk, Label
     
@@ -0,0 +1,379 @@
+"""
+Statistics of a call to `functions.load`, pass a `LoadStats` as `stats` and
+the loader fills it. Every phase of the load gets its wall time and number of
+calls, and the tcl calls made while building the widgets are counted. Set
+TKSYSTEM_STATS to collect them on every load, the stats are given to the
+functions of `hooks` or printed to stderr when there is none. Nothing is
+measured when the stats are disabled.
+
+`LineProfile` also attributes the time and the tcl calls to the lines of the
+.tk file nested under their widgets, set TKSYSTEM_PROFILE to a filename to
+profile every load and append its collapsed stacks (the input of flamegraph
+tools) to it.
+
+`MemoryProfile` measures with tracemalloc the memory every line and widget
+keeps while the load runs, and after the window is destroyed which of the
+objects the load created are still alive.
+"""
+
+import gc
+import os
+import sys
+import tracemalloc
+import weakref
+from time import perf_counter
+
+# phases of a load in the order they happen.
+PHASES = (
+    'module', 'read', 'compile', 'names', 'resolve', 'evaluate', 'create', 'configure',
+    'ids', 'geometry', 'methods', 'script', 'eval_script', 'total'
+)
+
+# functions called with the stats at the end of every measured load.
+hooks = []
+
+# methods of the tcl interpreter that cross from python into tcl.
+TCL_METHODS = frozenset([
+    'call', 'eval', 'evalfile', 'record', 'createcommand', 'deletecommand',
+    'setvar', 'getvar', 'unsetvar', 'globalsetvar', 'globalgetvar',
+    'globalunsetvar', 'createfilehandler', 'deletefilehandler', 'mainloop',
+    'dooneevent', 'adderrorinfo', 'exprstring', 'exprlong', 'exprdouble',
+    'exprboolean'
+])
+
+
+class TclCounter:
+    """Stands in the place of the tcl interpreter of a widget and counts the
+    calls made to it, every widget created under it shares the counter.
+    """
+    def __init__(self, tk, stats):
+        self.tk = tk
+        self.stats = stats
+
+    def __getattr__(self, name):
+        attribute = getattr(self.tk, name)
+        if name not in TCL_METHODS: return attribute
+        stats = self.stats
+
+        def counted(*args, **kwargs):
+            stats.tcl_calls += 1
+            return attribute(*args, **kwargs)
+        return counted
+
+
+def enabled():
+    return bool(os.environ.get('TKSYSTEM_STATS'))
+
+
+def default_stats():
+    """Stats of a load that didn't get any, None unless enabled by the
+    environment.
+    """
+    if os.environ.get('TKSYSTEM_PROFILE'): return LineProfile()
+    if enabled(): return LoadStats()
+    return None
+
+
+def emit(stats):
+    filename = os.environ.get('TKSYSTEM_PROFILE')
+    if filename and isinstance(stats, LineProfile): stats.write(filename)
+    if hooks:
+        for hook in hooks: hook(stats)
+    elif enabled():
+        print(stats.report(), file=sys.stderr)
+
+
+def add_hook(function):
+    hooks.append(function)
+    return function
+
+
+class LoadStats:
+    def __init__(self):
+        self.filename = None
+        self.phases = {}
+        self.names_resolved = 0
+        self.names_missing = 0
+        self.tcl_calls = 0
+        self._root = None
+
+    def add(self, phase, start, calls=1, line=None):
+        """Adds the time since `start` (a `perf_counter` value) to the phase,
+        `line` is the line of the .tk file it was spent on. Returns the time.
+        """
+        elapsed = perf_counter() - start
+        entry = self.phases.get(phase)
+        if entry is None: self.phases[phase] = [elapsed, calls]
+        else:
+            entry[0] += elapsed
+            entry[1] += calls
+        return elapsed
+
+    def begin(self):
+        """Called when the load starts."""
+
+    def finish(self):
+        """Called when the load is over, even if it failed."""
+
+    def enter(self, record, depth):
+        """Called when the widget of the record starts to be built, `depth` is
+        the number of its ancestors.
+        """
+
+    def track(self, value, line):
+        """Called with every widget created and value evaluated, `line` is the
+        line of the .tk file it comes from.
+        """
+
+    def time(self, phase):
+        return self.phases.get(phase, (0.0, 0))[0]
+
+    def calls(self, phase):
+        return self.phases.get(phase, (0.0, 0))[1]
+
+    @property
+    def namespace_time(self):
+        return self.time('names')
+
+    def count_tcl_calls(self, widget):
+        """Counts the tcl calls of the widget and the ones created after it."""
+        tk = getattr(widget, 'tk', None)
+        if tk is None or isinstance(tk, TclCounter): return
+        widget.tk = TclCounter(tk, self)
+        self._root = widget
+
+    def stop_counting(self):
+        """Gives back the real interpreter to every widget under the root."""
+        if self._root is None: return
+        widgets = [self._root]
+        while widgets:
+            widget = widgets.pop()
+            if isinstance(getattr(widget, 'tk', None), TclCounter):
+                widget.tk = widget.tk.tk
+            widgets.extend(getattr(widget, 'children', {}).values())
+        self._root = None
+
+    def as_dict(self):
+        result = {key: value for key, value in vars(self).items() if not key.startswith('_')}
+        result['phases'] = {
+            phase: {'time': time, 'calls': calls}
+            for phase, (time, calls) in sorted(self.phases.items(), key=phase_order)
+        }
+        return result
+
+    def report(self):
+        lines = ['load stats']
+        for phase, (time, calls) in sorted(self.phases.items(), key=phase_order):
+            lines.append(f'  {phase:12} {time * 1000:10.3f} ms {calls:8} calls')
+        lines.append(f'  names        {self.names_resolved} resolved, {self.names_missing} missing')
+        lines.append(f'  tcl calls    {self.tcl_calls}')
+        return '\n'.join(lines)
+
+    def __repr__(self):
+        phases = ' '.join([f'{phase}={time * 1000:.3f}ms' for phase, (time, _) in sorted(self.phases.items(), key=phase_order)])
+        return (
+            f'<LoadStats {phases} names_resolved={self.names_resolved} '
+            f'names_missing={self.names_missing} tcl_calls={self.tcl_calls}>'
+        )
+
+
+def phase_order(item):
+    phase = item[0]
+    return PHASES.index(phase) if phase in PHASES else len(PHASES)
+
+
+class LineProfile(LoadStats):
+    """Stats that also attribute the time and the tcl calls to the lines of
+    the .tk file. Every cost is kept under a stack of frames, the widgets
+    from the root to the one being built, the property line if any and the
+    phase, `file:line name` each. Costs of the whole file (reading,
+    compiling, the tcl script) are kept under their phase alone.
+    """
+    def __init__(self):
+        super().__init__()
+        self.stacks = {}
+        self._stack = []
+        self._labels = {}
+        self._record_line = None
+        self._tcl_calls = 0
+
+    def frame(self, line, label):
+        name = os.path.basename(self.filename) if self.filename else '<TkSystem>'
+        return f'{name}:{line} {label}'.replace(';', ',')
+
+    def enter(self, record, depth):
+        del self._stack[depth:]
+        self._stack.append(self.frame(record.line, record.name))
+        self._record_line = record.line
+        self._labels = {prop.line: prop.key for prop in record.properties}
+
+    def add(self, phase, start, calls=1, line=None):
+        elapsed = super().add(phase, start, calls, line)
+        # tcl calls made since the last measured step belong to this one.
+        tcl_calls = self.tcl_calls - self._tcl_calls
+        self._tcl_calls = self.tcl_calls
+        if phase == 'total': return elapsed
+        if line is None: stack = (phase, )
+        elif line == self._record_line: stack = (*self._stack, phase)
+        else: stack = (*self._stack, self.frame(line, self._labels.get(line, '')), phase)
+        entry = self.stacks.get(stack)
+        if entry is None: self.stacks[stack] = [elapsed, tcl_calls]
+        else:
+            entry[0] += elapsed
+            entry[1] += tcl_calls
+        return elapsed
+
+    def collapsed(self, metric='time'):
+        """Lines of the collapsed stack format, `frame;frame;... value`, with
+        the microseconds (metric 'time') or the tcl calls ('tcl_calls').
+        """
+        index = 0 if metric == 'time' else 1
+        lines = []
+        for stack, entry in self.stacks.items():
+            value = round(entry[0] * 1e6) if index == 0 else entry[1]
+            if value: lines.append(f"{';'.join(stack)} {value}")
+        return '\n'.join(lines)
+
+    def write(self, filename, metric='time'):
+        """Appends the collapsed stacks to the file, stacks of many loads can
+        be written to the same file.
+        """
+        text = self.collapsed(metric)
+        if not text: return
+        with open(filename, 'a') as f:
+            f.write(text + '\n')
+
+    def by_line(self):
+        """Time and tcl calls of every line of the file, from the most
+        expensive.
+        """
+        lines = {}
+        for stack, (time, tcl_calls) in self.stacks.items():
+            if len(stack) < 2: continue
+            entry = lines.setdefault(stack[-2], [0.0, 0])
+            entry[0] += time
+            entry[1] += tcl_calls
+        return sorted(lines.items(), key=lambda item: item[1][0], reverse=True)
+
+    def report(self, top=10):
+        lines = [super().report(), 'most expensive lines']
+        for frame, (time, tcl_calls) in self.by_line()[:top]:
+            lines.append(f'  {frame:40} {time * 1000:10.3f} ms {tcl_calls:8} tcl calls')
+        return '\n'.join(lines)
+
+
+class MemoryProfile(LineProfile):
+    """Line profile that also measures the memory each step keeps, the bytes
+    traced by tracemalloc and the blocks allocated by python (about one per
+    object) are grouped by line and by widget. Memory is traced only while
+    the load runs, the python lines that allocated the memory still in use
+    when it ended are kept. After the window is destroyed `retained()` tells
+    which widgets and values of the load are still alive. Times are slower
+    than without memory tracing.
+    """
+    def __init__(self, frames=1):
+        super().__init__()
+        self.memory = {}
+        self.widgets = {}
+        self.frames = frames
+        self.allocations = []
+        self._tracked = []
+        self._widget = None
+        self._started = False
+        self._start_snapshot = None
+        self._bytes = 0
+        self._blocks = 0
+
+    def begin(self):
+        self._started = not tracemalloc.is_tracing()
+        if self._started: tracemalloc.start(self.frames)
+        self._start_snapshot = tracemalloc.take_snapshot()
+        self._bytes = tracemalloc.get_traced_memory()[0]
+        self._blocks = sys.getallocatedblocks()
+
+    def finish(self):
+        """Keeps the difference with the start of the allocations still in
+        use and stops the tracing started by `begin`.
+        """
+        if self._start_snapshot is None: return
+        try:
+            snapshot = tracemalloc.take_snapshot().filter_traces([
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, __file__)
+            ])
+            self.allocations = snapshot.compare_to(self._start_snapshot, 'lineno')
+        finally:
+            self._start_snapshot = None
+            if self._started:
+                tracemalloc.stop()
+                self._started = False
+
+    def enter(self, record, depth):
+        super().enter(record, depth)
+        self._widget = record.name
+
+    def add(self, phase, start, calls=1, line=None):
+        if not tracemalloc.is_tracing(): return super().add(phase, start, calls, line)
+        size = tracemalloc.get_traced_memory()[0] - self._bytes
+        count = sys.getallocatedblocks() - self._blocks
+        elapsed = super().add(phase, start, calls, line)
+        if phase != 'total': self.count(phase, line, size, count)
+        # the memory of the profile itself is not counted in the next step.
+        self._bytes = tracemalloc.get_traced_memory()[0]
+        self._blocks = sys.getallocatedblocks()
+        return elapsed
+
+    def count(self, phase, line, size, count):
+        if line is None: frame = phase
+        elif line == self._record_line: frame = self._stack[-1]
+        else: frame = self.frame(line, self._labels.get(line, ''))
+        for key, groups in ((frame, self.memory), (self._widget, self.widgets)):
+            if key is None: continue
+            entry = groups.setdefault(key, [0, 0])
+            entry[0] += size
+            entry[1] += count
+
+    def track(self, value, line):
+        try:
+            reference = weakref.ref(value)
+        except TypeError:
+            return
+        if line == self._record_line: frame = self._stack[-1]
+        else: frame = self.frame(line, self._labels.get(line, ''))
+        self._tracked.append((reference, frame, type(value).__name__))
+
+    def by_line(self):
+        """Bytes and blocks kept by every line of the file, from the
+        biggest.
+        """
+        return sorted(self.memory.items(), key=lambda item: item[1][0], reverse=True)
+
+    def by_widget(self):
+        return sorted(self.widgets.items(), key=lambda item: item[1][0], reverse=True)
+
+    def retained(self, top=10):
+        """Call it after the window is destroyed. Returns the widgets and
+        values of the load still alive grouped by line and type, with how
+        many of them, and the python lines that allocated the memory still
+        in use when the load ended.
+        """
+        gc.collect()
+        alive = {}
+        for reference, frame, type_name in self._tracked:
+            if reference() is None: continue
+            key = (frame, type_name)
+            alive[key] = alive.get(key, 0) + 1
+        allocations = [
+            (str(statistic.traceback), statistic.size_diff, statistic.count_diff)
+            for statistic in self.allocations[:top] if statistic.size_diff > 0
+        ]
+        return sorted(alive.items(), key=lambda item: item[1], reverse=True), allocations
+
+    def report(self, top=10):
+        lines = [LoadStats.report(self), 'memory by line']
+        for frame, (size, count) in self.by_line()[:top]:
+            lines.append(f'  {frame:40} {size:12,} bytes {count:8} blocks')
+        lines.append('memory by widget')
+        for name, (size, count) in self.by_widget()[:top]:
+            lines.append(f'  {name:40} {size:12,} bytes {count:8} blocks')
+        return '\n'.join(lines)
@@ -0,0 +1,266 @@
+"""
+Watches files from a thread and calls back in the thread of the window. On
+linux the changes come from inotify, elsewhere the files are polled with
+`os.stat` every `interval` seconds. Changes that come close together are
+debounced into a single call, every callback gets only the files it watches
+that changed. The calls are queued and the watcher thread writes to a pipe
+that tk watches with `createfilehandler`, so the thread of the window runs
+them as soon as they come and is never woken otherwise. Where tk has no file
+handlers (windows) the queue is checked from `after` every `DRAIN_INTERVAL`
+milliseconds. Tk is never called from the watcher thread and its event loop
+is never blocked by it.
+"""
+
+import os
+import queue
+import select
+import struct
+import sys
+import threading
+from time import monotonic
+
+# milliseconds between checks of the queued calls in the thread of the window
+# when tk can't watch a pipe.
+DRAIN_INTERVAL = 50
+
+#######################################
+# INOTIFY
+#######################################
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+# editors save by writing in place or by replacing the file.
+MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_ATTRIB | IN_MODIFY
+EVENT = struct.Struct('iIII')
+
+
+def load_inotify():
+    """Functions of inotify from the C library, None if not available."""
+    if not sys.platform.startswith('linux'): return None
+    try:
+        import ctypes
+        import ctypes.util
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        inotify = libc.inotify_init1, libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+    inotify[1].argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+    return inotify
+
+
+class InotifySource:
+    """Directories of the watched files are watched, so files replaced by
+    a new one are still seen.
+    """
+    def __init__(self, inotify):
+        init, self.add_watch = inotify
+        self.fd = init(os.O_CLOEXEC)
+        if self.fd < 0: raise OSError('inotify_init1 failed')
+        self.directories = {}
+        self._read, self._write = os.pipe()
+
+    def add(self, path):
+        directory = os.path.dirname(path)
+        if directory in self.directories.values(): return
+        descriptor = self.add_watch(self.fd, os.fsencode(directory), MASK)
+        if descriptor < 0: raise OSError(f'inotify_add_watch failed for {directory}')
+        self.directories[descriptor] = directory
+
+    def wait(self, timeout):
+        """Paths changed before the timeout (None waits forever) or `wake`."""
+        ready, _, _ = select.select([self.fd, self._read], [], [], timeout)
+        if self.fd not in ready: return []
+        data = os.read(self.fd, 64 * 1024)
+        paths = []
+        offset = 0
+        while offset < len(data):
+            descriptor, _, _, length = EVENT.unpack_from(data, offset)
+            offset += EVENT.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            directory = self.directories.get(descriptor)
+            if directory is not None and name:
+                paths.append(os.path.join(directory, os.fsdecode(name)))
+        return paths
+
+    def wake(self):
+        os.write(self._write, b'\0')
+
+    def close(self):
+        os.close(self.fd)
+        os.close(self._read)
+        os.close(self._write)
+
+#######################################
+# POLLING
+#######################################
+
+def file_state(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class PollingSource:
+    """Compares the modification time and size of the files every
+    `interval` seconds, an event wakes it up since `select` only takes
+    sockets on windows.
+    """
+    def __init__(self, interval):
+        self.interval = interval
+        self.states = {}
+        self.woken = threading.Event()
+
+    def add(self, path):
+        self.states[path] = file_state(path)
+
+    def wait(self, timeout):
+        if timeout is None or timeout > self.interval: timeout = self.interval
+        if self.woken.wait(timeout): return []
+        paths = []
+        for path, state in self.states.items():
+            current = file_state(path)
+            if current != state:
+                self.states[path] = current
+                paths.append(path)
+        return paths
+
+    def wake(self):
+        self.woken.set()
+
+    def close(self):
+        pass
+
+#######################################
+# WATCHER
+#######################################
+
+class FileWatcher:
+    """Calls `callback(paths)` in the thread of `widget` when the files given
+    to `watch` change. A burst of changes is given as one call once no other
+    change came for `debounce` seconds. `use_inotify` False forces polling.
+    """
+    def __init__(self, widget, interval=0.5, debounce=0.2, use_inotify=True):
+        self.widget = widget
+        self.interval = interval
+        self.debounce = debounce
+        self.callbacks = {}
+        inotify = load_inotify() if use_inotify else None
+        self.source = InotifySource(inotify) if inotify else PollingSource(interval)
+        self.thread = None
+        self.stopped = False
+        self.calls = queue.SimpleQueue()
+        self._after = None
+        self._pipe = None
+
+    def watch(self, path, callback):
+        path = os.path.abspath(path)
+        self.callbacks.setdefault(path, []).append(callback)
+        self.source.add(path)
+
+    def start(self):
+        """Starts the thread, it must be called from the thread of the window."""
+        tk = getattr(self.widget, 'tk', None)
+        if hasattr(tk, 'createfilehandler'):
+            from tkinter import READABLE
+            self._pipe = os.pipe()
+            for fd in self._pipe: os.set_blocking(fd, False)
+            tk.createfilehandler(self._pipe[0], READABLE, self.woken)
+        else:
+            self._after = self.widget.after(DRAIN_INTERVAL, self.drain)
+        self.thread = threading.Thread(target=self.run, name='tksystem-watcher', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        if self.stopped: return
+        self.stopped = True
+        self.source.wake()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join()
+        self.source.close()
+        if self._after is not None:
+            try:
+                self.widget.after_cancel(self._after)
+            except Exception:
+                pass
+            self._after = None
+        if self._pipe is not None:
+            self.widget.tk.deletefilehandler(self._pipe[0])
+            for fd in self._pipe: os.close(fd)
+            self._pipe = None
+
+    def run(self):
+        pending = set()
+        last = None
+        while not self.stopped:
+            timeout = None if last is None else max(self.debounce - (monotonic() - last), 0)
+            changed = [path for path in self.source.wait(timeout) if path in self.callbacks]
+            if self.stopped: return
+            if changed:
+                pending.update(changed)
+                last = monotonic()
+            elif pending and monotonic() - last >= self.debounce:
+                self.hand_off(pending)
+                pending = set()
+                last = None
+
+    def hand_off(self, paths):
+        """Queues the callbacks of the changed files for the thread of the
+        window, every callback once, and wakes it.
+        """
+        calls = {}
+        for path in sorted(paths):
+            for callback in self.callbacks[path]:
+                calls.setdefault(callback, []).append(path)
+        self.calls.put(calls)
+        if self._pipe is None: return
+        try:
+            os.write(self._pipe[1], b'\0')
+        except BlockingIOError:
+            # the pipe is full of wakeups the window hasn't read yet.
+            pass
+
+    def woken(self, fd, mask):
+        """Called by tk in the thread of the window when the watcher thread
+        wrote to the pipe.
+        """
+        try:
+            os.read(fd, 4096)
+        except BlockingIOError:
+            pass
+        self.drain()
+
+    def drain(self):
+        """Runs the queued callbacks in the thread of the window. When they
+        are checked from `after` and it can't be scheduled again the window
+        is gone, the watcher stops and says so.
+        """
+        self._after = None
+        try:
+            while not self.stopped:
+                try:
+                    calls = self.calls.get_nowait()
+                except queue.Empty:
+                    break
+                self.dispatch(calls)
+        finally:
+            if not self.stopped and self._pipe is None: self.schedule()
+
+    def schedule(self):
+        try:
+            self._after = self.widget.after(DRAIN_INTERVAL, self.drain)
+        except Exception as exception:
+            print(f'FileWatcher stopped, the window can\'t run callbacks: {exception}', file=sys.stderr)
+            self.stop()
+
+    def dispatch(self, calls):
+        for callback, paths in calls.items():
+            callback(paths)
@@ -0,0 +1,55 @@
+import os
+
+from tksystem import cache
+from tksystem.program import compile_lines
+
+
+def write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+    return str(path)
+
+
+def load(filename):
+    return cache.load_program(filename, compile_lines)
+
+
+def test_same_names_in_a_shared_folder(tmp_path, monkeypatch):
+    monkeypatch.setenv('TKSYSTEM_CACHE_DIR', str(tmp_path / 'cache'))
+    monkeypatch.delenv('TKSYSTEM_NO_CACHE', raising=False)
+    first = write(tmp_path / 'a' / 'main.tk', "Tk\n\ttitle: 'a'\n")
+    second = write(tmp_path / 'b' / 'main.tk', "Tk\n\ttitle: 'b'\n")
+    cache.stats.reset()
+    load(first)
+    load(second)
+    load(first)
+    load(second)
+    assert (cache.stats.hits, cache.stats.misses) == (2, 2)
+    assert len(os.listdir(tmp_path / 'cache')) == 2
+
+
+def test_put_prunes_only_the_entries_of_the_file(tmp_path, monkeypatch):
+    monkeypatch.delenv('TKSYSTEM_CACHE_DIR', raising=False)
+    monkeypatch.delenv('TKSYSTEM_NO_CACHE', raising=False)
+    main = write(tmp_path / 'main.tk', "Tk\n\ttitle: 'a'\n")
+    other = write(tmp_path / 'main.tk.old', "Tk\n\ttitle: 'b'\n")
+    load(main)
+    load(other)
+    write(tmp_path / 'main.tk', "Tk\n\ttitle: 'c'\n")
+    load(main)
+    entries = os.listdir(tmp_path / cache.CACHE_FOLDER)
+    assert len(entries) == 2
+    assert len([entry for entry in entries if entry.startswith('main.tk.old.')]) == 1
+
+
+def test_mapped_and_read_lines_are_the_same(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, 'encoding', lambda: 'latin-1')
+    data = "Tk\r\n\ttitle: 'caf\xe9'\n\n\tLabel".encode('latin-1')
+    filename = tmp_path / 'main.tk'
+    filename.write_bytes(data)
+    mapped = cache.read_source(str(filename))
+    try:
+        assert list(cache.iter_lines(mapped)) == list(cache.iter_lines(data))
+    finally:
+        mapped.close()
+    assert list(cache.iter_lines(data)) == ['Tk\r\n', "\ttitle: 'caf\xe9'\n", '\n', '\tLabel']
@@ -0,0 +1,151 @@
+import math
+from collections import ChainMap
+
+import pytest
+
+from tksystem import parser
+from tksystem.compiler import compile_source
+
+
+class Widget:
+    def __init__(self, **options):
+        self.options = options
+
+    def __getitem__(self, key):
+        return self.options[key]
+
+    def cget(self, key):
+        return self.options[key]
+
+
+SCOPE = {
+    'n': 3,
+    'x': 2.5,
+    'zero': 0,
+    'text': 'abc',
+    'items': [1, 2],
+    'nothing': None,
+    'widget': Widget(width=10),
+    'data': {'a': 1},
+    'sqrt': math.sqrt,
+    'pair': lambda a, b: [a, b],
+    'apply': lambda function, value: function(value),
+    'fail': lambda: {}['missing'],
+}
+
+SOURCES = [
+    '1 + 2 * 3',
+    '2 ^ 3 ^ 2',
+    '7 / 2',
+    '1 / 0',
+    'n / zero',
+    '-n + +x',
+    '-"abc"',
+    '+"abc"',
+    'not 0',
+    'not text',
+    'not items',
+    '1 and 2',
+    '0 and 1 / 0',
+    '1 or 1 / 0',
+    '0 or 2.5',
+    '"a" and "b"',
+    'items and n',
+    '1 < 2',
+    '"a" < "b"',
+    '"a" == "a"',
+    '[1] == [1]',
+    '1 < "a"',
+    '"a" == 1',
+    '0 ^ -1',
+    'n + x',
+    'n * text',
+    'text * 2.5',
+    'text + text',
+    'text + 1',
+    '[1, 2] + items',
+    'items * 2',
+    '{"a": n, "b": [text]}',
+    'nothing + 1',
+    'rgb(255, 0, n)',
+    'rgb(1.5, 0, 0)',
+    'sqrt(16)',
+    'sqrt(text)',
+    'pair(1, text)',
+    'nothing()',
+    'fail()',
+    'apply(lambda(v) -> v * 2, n)',
+    'apply(lambda(v) -> v / 0, n)',
+    'apply(rgb, 1)',
+    '(lambda(a) -> a)(1, 2)',
+    'apply(apply(lambda(a) -> lambda(b) -> a + b, 1), 2)',
+    'lambda f(a) -> a + 1',
+    'widget.cget',
+    'widget["width"]',
+    'widget["height"]',
+    'data["a"]',
+    'data["b"]',
+    'widget.missing',
+    'text.upper',
+    'undefined',
+    '1 or undefined',
+]
+
+# python words the errors of calls with a wrong number of arguments itself.
+ARITY = {'apply(rgb, 1)', '(lambda(a) -> a)(1, 2)'}
+
+
+@pytest.mark.parametrize('source', SOURCES)
+def test_compiled_and_interpreted(source):
+    expression, error = compile_source('<test>', source)
+    assert error is None
+    compiled, compiled_error = expression.evaluate(SCOPE)
+    interpreted, interpreted_error = expression.interpret(SCOPE)
+
+    assert (compiled_error is None) == (interpreted_error is None)
+    if compiled_error:
+        if source not in ARITY:
+            assert compiled_error.details == interpreted_error.details
+        assert compiled_error.start.index == interpreted_error.start.index
+        assert compiled_error.end.index == interpreted_error.end.index
+    elif callable(compiled):
+        assert callable(interpreted)
+    else:
+        assert compiled == interpreted
+        assert type(compiled) is type(interpreted)
+
+
+@pytest.mark.parametrize('source', ['"a" == 1', '[1] == [1]', 'not "abc"', 'items and n', 'text * 2.5'])
+def test_operations_are_typed(source):
+    expression, _ = compile_source('<test>', source)
+    for value, error in [expression.evaluate(SCOPE), expression.interpret(SCOPE)]:
+        assert value is None
+        assert error.details == parser.ILLEGAL_OPERATION
+
+
+@pytest.mark.parametrize('source, args', [
+    ('lambda(a, b) -> a * b', (3, 4)),
+    ('lambda(a) -> rgb(a, a, a)', (255, )),
+    ('rgb', (1, 2, 3)),
+])
+def test_functions_called_from_python(source, args):
+    expression, _ = compile_source('<test>', source)
+    compiled, _ = expression.evaluate(SCOPE)
+    interpreted, _ = expression.interpret(SCOPE)
+    assert compiled(*args) == interpreted(*args)
+
+
+def test_function_errors_called_from_python():
+    expression, _ = compile_source('<test>', 'lambda(a) -> a / 0')
+    interpreted, _ = expression.interpret(SCOPE)
+    with pytest.raises(parser.CallbackError):
+        interpreted(1)
+
+
+def test_functions_keep_the_scope_of_their_evaluation():
+    expression, _ = compile_source('<test>', "lambda() -> self['text']")
+    scope = ChainMap({'self': Widget(text='first')}, {}, SCOPE)
+    compiled, _ = expression.evaluate(scope)
+    interpreted, _ = expression.interpret(scope)
+    scope['self'] = Widget(text='second')
+    assert compiled() == interpreted() == 'first'
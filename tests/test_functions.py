@@ -0,0 +1,17 @@
+from tksystem.functions import assign_parent, parse_file
+
+
+class Widget:
+    def __init__(self, master=None):
+        self.master = master
+
+
+def test_assign_parent():
+    root = Widget()
+    frame = Widget(root)
+    label = Widget(frame)
+    widgets = parse_file('Tk\n\tFrame\n\t\tLabel\n\tButton\nToplevel')
+    assert assign_parent(frame, widgets[2], 1) is frame
+    assert assign_parent(label, widgets[2], 2) is frame
+    assert assign_parent(label, widgets[3], 2) is root
+    assert assign_parent(label, widgets[4], 2) is None
@@ -0,0 +1,75 @@
+"""
+Import time of tksystem measured with `python -X importtime`, the command
+line tools import it without opening a window so neither tkinter nor
+pylejandria may be imported by it nor by `tksystem.functions`, and
+`import tksystem` must stay under the budget (TKSYSTEM_IMPORT_BUDGET in ms
+to change it).
+"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+SRC = os.path.join(os.path.dirname(__file__), '..', 'src')
+BUDGET = float(os.environ.get('TKSYSTEM_IMPORT_BUDGET', 5.0))
+FORBIDDEN = ('tkinter', 'tkinter.ttk', 'pylejandria')
+
+
+def run(code, *options, path=()):
+    env = os.environ.copy()
+    env['PYTHONPATH'] = os.pathsep.join([SRC, *path, env.get('PYTHONPATH', '')])
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    return subprocess.run(
+        [sys.executable, *options, '-c', code],
+        env=env, capture_output=True, text=True, check=True
+    )
+
+
+def import_times(module):
+    """Cumulative microseconds of every module imported by `import module`,
+    with the depth it was imported at.
+    """
+    result = run(f'import {module}', '-X', 'importtime')
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:'): continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if not cumulative.strip().isdigit(): continue
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        times[name.strip()] = (int(cumulative), depth)
+    return times
+
+
+@pytest.mark.parametrize('module', ['tksystem', 'tksystem.functions'])
+def test_no_gui_modules_imported(module):
+    times = import_times(module)
+    assert [name for name in FORBIDDEN if name in times] == []
+
+
+def test_import_budget():
+    # the first run writes the bytecode of the package
+    import_times('tksystem')
+    times = import_times('tksystem')
+    total = sum([
+        time for name, (time, depth) in times.items()
+        if depth == 0 and name.partition('.')[0] == 'tksystem'
+    ]) / 1000
+    assert total <= BUDGET, f'import tksystem took {total:.2f} ms, budget {BUDGET:.2f} ms'
+
+
+def test_tkinter_widget_does_not_import_pylejandria(tmp_path):
+    # an importable pylejandria, so importing it eagerly would be seen.
+    package = tmp_path / 'pylejandria'
+    package.mkdir()
+    (package / '__init__.py').write_text('')
+    (package / 'gui.py').write_text('class Label: pass\n')
+    code = (
+        'import sys\n'
+        'from tksystem.registry import registry\n'
+        'print(registry.resolve("tk.Label").__module__)\n'
+        'print("pylejandria.gui" in sys.modules)\n'
+    )
+    result = run(code, path=[str(tmp_path)])
+    assert result.stdout.split() == ['tkinter', 'False']
@@ -0,0 +1,145 @@
+import pytest
+
+from tksystem.backends import RecordingBackend
+from tksystem.functions import apply, load
+from tksystem.reconcile import reconciler_of
+
+TEXT = """Tk
+\tFrame
+\t\tid: 'top'
+\t\t.pack: {}
+\t\tLabel
+\t\t\tid: 'title'
+\t\t\ttext: 'title'
+\t\t\t.pack: {}
+\tFrame
+\t\tid: 'bottom'
+\t\t.pack: {}
+\tButton
+\t\ttext: 'ok'
+\t\t.pack: {}
+"""
+
+
+@pytest.fixture
+def window(tmp_path, monkeypatch):
+    monkeypatch.setenv('TKSYSTEM_NO_CACHE', '1')
+    filename = tmp_path / 'main.tk'
+    filename.write_text(TEXT)
+    backend = RecordingBackend()
+    window, error = load(str(filename), None, backend=backend)
+    assert error is None
+    backend.events.clear()
+    return window
+
+
+def events(window):
+    return reconciler_of(window).backend.events
+
+
+def names(widget):
+    return [child.widget_class.__name__ for child in widget.children]
+
+
+@pytest.mark.parametrize('text', ['', '\n\t\n  \n'])
+def test_load_empty_file(tmp_path, monkeypatch, text):
+    monkeypatch.setenv('TKSYSTEM_NO_CACHE', '1')
+    filename = tmp_path / 'empty.tk'
+    filename.write_text(text)
+    assert load(str(filename), None, backend=RecordingBackend()) == (None, None)
+
+
+def test_lazy_widgets_record_only_the_program(tmp_path, monkeypatch):
+    monkeypatch.setenv('TKSYSTEM_NO_CACHE', '1')
+    filename = tmp_path / 'lazy.tk'
+    filename.write_text(TEXT.replace("\t\tid: 'top'\n", "\t\tid: 'top'\n\t\tlazy: True\n"))
+    backend = RecordingBackend()
+    window, error = load(str(filename), None, backend=backend)
+    assert error is None
+    top = window.children[0]
+    assert [event for event in backend.events if event[0] == 'call'] == []
+    assert top.children == []
+    changes, error = reconciler_of(window).expand(top)
+    assert error is None
+    assert names(top) == ['Label']
+
+
+def test_same_text_changes_nothing(window):
+    changes, error = apply(window, TEXT)
+    assert error is None
+    assert events(window) == []
+    assert (changes.created, changes.destroyed, changes.configured) == (0, 0, 0)
+
+
+def test_only_changed_options_are_configured(window):
+    button = window.children[2]
+    changes, error = apply(window, TEXT.replace("'ok'", "'cancel'"))
+    assert error is None
+    assert events(window) == [('configure', button, {'text': 'cancel'})]
+    assert changes.configured == 1
+
+
+def test_widgets_are_created_and_destroyed(window):
+    text = TEXT.replace("\tButton\n\t\ttext: 'ok'\n", "\tEntry\n\t\twidth: 3\n")
+    changes, error = apply(window, text)
+    assert error is None
+    assert (changes.created, changes.destroyed) == (1, 1)
+    assert names(window) == ['Frame', 'Frame', 'Entry']
+
+
+def test_widgets_move_by_id(window):
+    button = window.children[2]
+    bottom = window.children[1]
+    moved = "\tButton\n\t\ttext: 'ok'\n\t\t.pack: {}\n"
+    text = TEXT.replace(moved, '').replace(
+        "\t\tid: 'bottom'\n\t\t.pack: {}\n",
+        "\t\tid: 'bottom'\n\t\t.pack: {}\n\t\tButton\n\t\t\tid: 'ok'\n\t\t\ttext: 'ok'\n\t\t\t.pack: {}\n"
+    )
+    assert apply(window, TEXT.replace("\tButton\n", "\tButton\n\t\tid: 'ok'\n"))[1] is None
+    changes, error = apply(window, text)
+    assert error is None
+    assert (changes.created, changes.destroyed, changes.moved) == (0, 0, 1)
+    assert ('geometry', button, 'pack', (), {'in_': bottom}) in events(window)
+    assert reconciler_of(window).scope.maps[1]['ok'] is button
+
+
+def test_errors_leave_the_widgets_as_they_were(window):
+    assert apply(window, TEXT.replace("'ok'", "('ok'"))[1]
+    assert apply(window, 'Frame\n')[1]
+    assert apply(window, '')[1]
+    assert events(window) == []
+
+
+def test_failed_apply_destroys_the_widgets_it_created(window):
+    new_label = "\tLabel\n\t\ttext: 'new'\n\t\t.pack: {}\n"
+    failing = TEXT.replace("\tButton\n", new_label + "\tButton\n").replace("'ok'", "1 / 0")
+    changes, error = apply(window, failing)
+    assert 'Division by Zero' in error
+    assert names(window) == ['Frame', 'Frame', 'Button']
+
+    changes, error = apply(window, TEXT.replace("\tButton\n", new_label + "\tButton\n"))
+    assert error is None
+    assert names(window) == ['Frame', 'Frame', 'Button', 'Label']
+    assert changes.created == 1
+
+
+def test_failed_apply_keeps_the_ids(window):
+    top = window.children[0]
+    text = TEXT.replace("\tButton\n", "\tLabel\n\t\tid: 'top'\n\t\ttext: 1 / 0\n\tButton\n")
+    assert apply(window, text)[1]
+    assert reconciler_of(window).scope.maps[1]['top'] is top
+
+
+def test_unknown_widgets_are_errors(window):
+    changes, error = apply(window, TEXT.replace('Button', 'Buton'))
+    assert changes is None
+    assert "Not widget 'Buton' founded." in error and 'line 12' in error
+    assert events(window) == []
+
+
+def test_unknown_widgets_are_load_errors(tmp_path, monkeypatch):
+    monkeypatch.setenv('TKSYSTEM_NO_CACHE', '1')
+    filename = tmp_path / 'main.tk'
+    filename.write_text('Tk\n\tLabl\n')
+    window, error = load(str(filename), None, backend=RecordingBackend())
+    assert window is None and "'Labl'" in error
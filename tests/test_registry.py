@@ -0,0 +1,49 @@
+import sys
+
+import pytest
+
+from tksystem.registry import WidgetRegistry
+
+
+@pytest.fixture
+def packages(tmp_path, monkeypatch):
+    (tmp_path / 'first_widgets.py').write_text('class Button: pass\n')
+    (tmp_path / 'second_widgets.py').write_text('class Button: pass\nclass Label: pass\n')
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield
+    for name in ('first_widgets', 'second_widgets'):
+        sys.modules.pop(name, None)
+
+
+def make_registry():
+    return WidgetRegistry((('first', 'first_widgets'), ('second', 'second_widgets')))
+
+
+def test_earlier_packages_win(packages):
+    registry = make_registry()
+    assert registry.resolve('Button').__module__ == 'first_widgets'
+    assert registry.resolve('second.Button').__module__ == 'second_widgets'
+    assert registry.resolve('Label').__module__ == 'second_widgets'
+
+
+def test_packages_are_imported_only_when_needed(packages):
+    registry = make_registry()
+    registry.resolve('Button')
+    assert 'first_widgets' in sys.modules
+    assert 'second_widgets' not in sys.modules
+    assert 'Label' in registry
+    assert 'second_widgets' in sys.modules
+
+
+def test_namespaces_import_only_their_package(packages):
+    registry = make_registry()
+    registry.resolve('second.Label')
+    assert 'first_widgets' not in sys.modules
+
+
+def test_missing_packages_and_names(packages):
+    registry = WidgetRegistry((('missing', 'not_a_package'), ('first', 'first_widgets')))
+    assert registry.resolve('Button').__module__ == 'first_widgets'
+    assert 'Missing' not in registry
+    with pytest.raises(AttributeError):
+        registry.resolve('first.Label')
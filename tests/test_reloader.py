@@ -0,0 +1,140 @@
+import importlib.util
+import sys
+import types
+
+import pytest
+
+from tksystem.backends import RecordingBackend
+from tksystem.reloader import HotReloader, swap_module
+
+V1 = '''
+class Base:
+    def greet(self):
+        return 'hello'
+
+    @classmethod
+    def kind(cls):
+        return 'base'
+
+
+class Child(Base):
+    def greet(self):
+        return super().greet() + ' v1'
+
+    @classmethod
+    def kind(cls):
+        return super().kind() + ' child v1'
+
+
+child = Child()
+
+
+def greet():
+    return 'greet v1'
+'''
+
+V2 = '''
+class Base:
+    def greet(self):
+        return 'hi'
+
+    @classmethod
+    def kind(cls):
+        return 'base'
+
+
+class Child(Base):
+    def greet(self):
+        return super().greet() + ' v2'
+
+    @classmethod
+    def kind(cls):
+        return super().kind() + ' child v2'
+
+    def shout(self):
+        return super().greet().upper()
+
+
+child = Child()
+
+
+def greet():
+    return 'greet v2'
+'''
+
+
+def import_file(filename, name='app'):
+    spec = importlib.util.spec_from_file_location(name, filename)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def app(tmp_path):
+    filename = tmp_path / 'app.py'
+    filename.write_text(V1)
+    return filename
+
+
+def test_swap_classes_that_use_super(app):
+    module = import_file(app)
+    child = module.child
+    app.write_text(V2)
+    swapped = swap_module(module, str(app))
+    assert set(swapped) == {'Base', 'Child', 'greet'}
+    assert module.child is child
+    assert isinstance(child, module.Child)
+    assert child.greet() == 'hi v2'
+    assert child.shout() == 'HI'
+    assert module.Child.kind() == 'base child v2'
+    assert module.greet() == 'greet v2'
+
+
+def test_swap_keeps_the_module_if_the_code_fails(app):
+    module = import_file(app)
+    app.write_text('def greet(:\n')
+    with pytest.raises(SyntaxError):
+        swap_module(module, str(app))
+    assert module.greet() == 'greet v1'
+
+
+@pytest.fixture
+def pylejandria(monkeypatch):
+    tools = types.ModuleType('pylejandria.tools')
+    tools.get_module = import_file
+    monkeypatch.setitem(sys.modules, 'pylejandria', types.ModuleType('pylejandria'))
+    monkeypatch.setitem(sys.modules, 'pylejandria.tools', tools)
+    monkeypatch.setenv('TKSYSTEM_NO_CACHE', '1')
+
+
+def test_values_of_swapped_functions_are_evaluated_again(app, tmp_path, pylejandria):
+    tk_file = tmp_path / 'app.tk'
+    tk_file.write_text('Tk\n\tLabel\n\t\ttext: greet()\n\tButton\n\t\tcommand: greet\n')
+    reloader = HotReloader(str(tk_file), str(app), backend=RecordingBackend())
+    window, error = reloader.load()
+    assert error is None
+    label, button = window.children
+    command = button['command']
+    assert label['text'] == 'greet v1'
+
+    app.write_text(V2)
+    changes, error = reloader.reload(module_changed=True)
+    assert error is None
+    assert label['text'] == 'greet v2'
+    # the callback is the same function, it runs the new code.
+    assert button['command'] is command and command() == 'greet v2'
+    assert (changes.configured, changes.swapped) == (1, 3)
+
+
+@pytest.mark.parametrize('text', ['Tk\n\tLabl\n', '', 'Tk\n\ttext: (\n'])
+def test_reload_errors_keep_the_window(app, tmp_path, pylejandria, capsys, text):
+    tk_file = tmp_path / 'app.tk'
+    tk_file.write_text('Tk\n\tLabel\n\t\ttext: greet()\n')
+    reloader = HotReloader(str(tk_file), str(app), backend=RecordingBackend())
+    window, error = reloader.load()
+    label = window.children[0]
+    tk_file.write_text(text)
+    assert reloader.check(force=True) is None
+    assert capsys.readouterr().err
+    assert window.children == [label]
@@ -0,0 +1,48 @@
+import tracemalloc
+
+import pytest
+
+from tksystem.backends import RecordingBackend
+from tksystem.functions import load
+from tksystem.stats import MemoryProfile
+
+
+@pytest.fixture
+def tk_file(tmp_path, monkeypatch):
+    monkeypatch.setenv('TKSYSTEM_NO_CACHE', '1')
+    def write(text):
+        path = tmp_path / 'main.tk'
+        path.write_text(text)
+        return str(path)
+    return write
+
+
+def test_memory_profile_traces_only_the_load(tk_file):
+    profile = MemoryProfile()
+    assert not tracemalloc.is_tracing()
+    window, error = load(
+        tk_file("Tk\n\ttitle: 'a'\n\tLabel\n\t\ttext: 'b' * 100\n"), None,
+        stats=profile, backend=RecordingBackend()
+    )
+    assert error is None
+    assert not tracemalloc.is_tracing()
+    assert profile.by_line()
+    alive, allocations = profile.retained()
+    assert alive
+    assert not tracemalloc.is_tracing()
+
+
+def test_memory_profile_stops_when_the_load_fails(tk_file):
+    profile = MemoryProfile()
+    window, error = load(tk_file("Tk\n\ttitle: (\n"), None, stats=profile, backend=RecordingBackend())
+    assert error
+    assert not tracemalloc.is_tracing()
+
+
+def test_tracing_started_before_is_left_running(tk_file):
+    tracemalloc.start()
+    try:
+        load(tk_file("Tk\n\ttitle: 'a'\n"), None, stats=MemoryProfile(), backend=RecordingBackend())
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
@@ -0,0 +1,129 @@
+import itertools
+import os
+import select
+import threading
+import time
+
+import pytest
+
+from tksystem.watcher import FileWatcher
+
+
+class FakeWindow:
+    """Runs the calls given to `after` in the thread that calls `run`."""
+    def __init__(self):
+        self.thread = threading.current_thread()
+        self.pending = {}
+        self.ids = itertools.count()
+        self.destroyed = False
+        self.handlers = {}
+
+    def after(self, ms, function):
+        assert threading.current_thread() is self.thread
+        if self.destroyed: raise RuntimeError('application has been destroyed')
+        key = f'after#{next(self.ids)}'
+        self.pending[key] = (time.monotonic() + ms / 1000, function)
+        return key
+
+    def after_cancel(self, key):
+        self.pending.pop(key, None)
+
+    def run(self, seconds):
+        end = time.monotonic() + seconds
+        while time.monotonic() < end:
+            for key, (when, function) in list(self.pending.items()):
+                if when <= time.monotonic() and self.pending.pop(key, None):
+                    function()
+            ready, _, _ = select.select(list(self.handlers), [], [], 0.005)
+            for fd in ready:
+                if fd in self.handlers: self.handlers[fd](fd, None)
+
+
+class FakeTkWindow(FakeWindow):
+    """A window whose tk can watch files, as it can on unix."""
+    def __init__(self):
+        super().__init__()
+        self.tk = self
+        self.wakeups = 0
+
+    def createfilehandler(self, fd, mask, function):
+        assert threading.current_thread() is self.thread
+        def handler(fd, mask):
+            self.wakeups += 1
+            function(fd, mask)
+        self.handlers[fd] = handler
+
+    def deletefilehandler(self, fd):
+        assert threading.current_thread() is self.thread
+        del self.handlers[fd]
+
+
+def save(path, text):
+    temp = f'{path}.tmp'
+    with open(temp, 'w') as f:
+        f.write(text)
+    os.replace(temp, path)
+    # polling compares the modification times.
+    time.sleep(0.02)
+
+
+@pytest.mark.parametrize('window_class', [FakeWindow, FakeTkWindow])
+@pytest.mark.parametrize('use_inotify', [True, False])
+def test_changes_are_debounced_in_the_window_thread(tmp_path, use_inotify, window_class):
+    first, second = str(tmp_path / 'a.tk'), str(tmp_path / 'b.py')
+    save(first, 'a')
+    save(second, 'b')
+    window = window_class()
+    calls = []
+    watcher = FileWatcher(window, interval=0.02, debounce=0.1, use_inotify=use_inotify)
+    watcher.watch(first, lambda paths: calls.append(('first', paths, threading.current_thread())))
+    watcher.watch(second, lambda paths: calls.append(('second', paths, threading.current_thread())))
+    watcher.start()
+    try:
+        window.run(0.05)
+        for text in ['aa', 'aaa', 'aaaa']:
+            save(first, text)
+        save(second, 'bb')
+        window.run(0.5)
+    finally:
+        watcher.stop()
+    assert calls == [
+        ('first', [first], window.thread),
+        ('second', [second], window.thread)
+    ]
+    assert not window.pending
+    assert not window.handlers
+
+
+def test_the_window_is_only_woken_with_calls(tmp_path):
+    path = str(tmp_path / 'a.tk')
+    save(path, 'a')
+    window = FakeTkWindow()
+    calls = []
+    watcher = FileWatcher(window, interval=0.02, debounce=0.05, use_inotify=False)
+    watcher.watch(path, calls.append)
+    watcher.start()
+    try:
+        window.run(0.2)
+        assert not window.pending
+        assert window.wakeups == 0
+        save(path, 'aa')
+        window.run(0.3)
+    finally:
+        watcher.stop()
+    assert calls == [[path]]
+    assert window.wakeups == 1
+
+
+def test_stops_when_the_window_is_gone(tmp_path, capsys):
+    path = str(tmp_path / 'a.tk')
+    save(path, 'a')
+    window = FakeWindow()
+    watcher = FileWatcher(window, interval=0.02, debounce=0.05, use_inotify=False)
+    watcher.watch(path, lambda paths: None)
+    watcher.start()
+    window.destroyed = True
+    window.run(0.1)
+    assert watcher.stopped
+    assert not watcher.thread.is_alive()
+    assert 'FileWatcher stopped' in capsys.readouterr().err